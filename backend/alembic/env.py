@@ -7,7 +7,7 @@ from alembic import context
 
 from dotenv import load_dotenv
 import os
-from app.db.models import Base, User, Action, Clip
+from app.db.models import Base, User, Action, Clip, ClipFeature
 
 target_metadata = Base.metadata
 
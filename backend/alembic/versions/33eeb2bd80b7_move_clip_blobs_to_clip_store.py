@@ -0,0 +1,141 @@
+"""Move clip blobs to the clip store
+
+Revision ID: 33eeb2bd80b7
+Revises: edfa33688af6
+Create Date: 2026-10-18 10:02:54.918302
+
+"""
+import hashlib
+import logging
+import os
+import shutil
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '33eeb2bd80b7'
+down_revision: Union[str, None] = 'edfa33688af6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+logger = logging.getLogger("alembic.runtime.migration")
+
+# Directory of the local clip store. The layouts below are frozen here so the
+# migration does not change with the app code
+CLIP_STORAGE_DIR = os.getenv(
+    "CLIP_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "storage", "clips"),
+)
+COPY_CHUNK_SIZE = 1024 * 1024
+
+clip = sa.table(
+    'clip',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.LargeBinary),
+    sa.column('storage_key', sa.String),
+    sa.column('size_bytes', sa.Integer),
+    sa.column('sha256', sa.String),
+)
+
+
+def legacy_path(key: str) -> str:
+    # Layout of the previous revision: <root>/<2 chars>/<key>
+    return os.path.join(CLIP_STORAGE_DIR, key[:2], key)
+
+
+def content_path(key: str) -> str:
+    # Content-addressed layout: <root>/<2 hex>/<2 hex>/<sha256>
+    return os.path.join(CLIP_STORAGE_DIR, key[:2], key[2:4], key)
+
+
+def copy_file(source: str, target: str) -> None:
+    """Copies through a temporary file, so `target` is either absent or complete."""
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(source, f"{target}.tmp")
+    os.replace(f"{target}.tmp", target)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(COPY_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('clip', sa.Column('sha256', sa.String(length=64), nullable=True))
+
+    bind = op.get_bind()
+
+    # Move the blobs still in the database to the clip store, one clip at a time
+    clip_ids = bind.execute(
+        sa.select(clip.c.id).where(clip.c.content.isnot(None), clip.c.storage_key.is_(None))
+    ).scalars().all()
+    for clip_id in clip_ids:
+        content = bind.execute(sa.select(clip.c.content).where(clip.c.id == clip_id)).scalar_one()
+        key = hashlib.sha256(content).hexdigest()
+        path = content_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(f"{path}.tmp", "wb") as f:
+                f.write(content)
+            os.replace(f"{path}.tmp", path)
+        bind.execute(
+            clip.update().where(clip.c.id == clip_id).values(
+                storage_key=key, size_bytes=len(content), sha256=key, content=None
+            )
+        )
+
+    # Re-store the clips uploaded with the previous layout under their content address
+    rows = bind.execute(
+        sa.select(clip.c.id, clip.c.storage_key).where(clip.c.storage_key.isnot(None), clip.c.sha256.is_(None))
+    ).all()
+    moved = []
+    for clip_id, key in rows:
+        source = legacy_path(key)
+        if not os.path.exists(source):
+            # Left as is: the clip was already unreadable, the rest still migrates
+            logger.warning("Clip %s: %s is missing, not moved to the clip store", clip_id, source)
+            continue
+        sha256 = file_sha256(source)
+        if not os.path.exists(content_path(sha256)):
+            copy_file(source, content_path(sha256))
+        bind.execute(
+            clip.update().where(clip.c.id == clip_id).values(
+                storage_key=sha256, size_bytes=os.path.getsize(source), sha256=sha256
+            )
+        )
+        moved.append(source)
+
+    # The legacy files go once every row points to its copy
+    for source in set(moved):
+        os.remove(source)
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema. Stored clips go back to the previous file layout and
+    keep their hash as key, a valid key for that layout. Clips that were in
+    clip.content before the upgrade stay in the store: this is not reverted.
+    """
+    bind = op.get_bind()
+
+    keys = bind.execute(
+        sa.select(clip.c.storage_key).where(clip.c.sha256.isnot(None)).distinct()
+    ).scalars().all()
+    for key in keys:
+        source = content_path(key)
+        if not os.path.exists(source):
+            logger.warning("%s is missing, not moved back to the previous layout", source)
+            continue
+        copy_file(source, legacy_path(key))
+    for key in keys:
+        if os.path.exists(content_path(key)):
+            os.remove(content_path(key))
+
+    op.drop_column('clip', 'sha256')
@@ -0,0 +1,32 @@
+"""Index action, clip and prediction lookups
+
+Revision ID: 5b8d2e61c4a9
+Revises: 33eeb2bd80b7
+Create Date: 2026-10-18 12:14:36.270415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8d2e61c4a9'
+down_revision: Union[str, None] = '33eeb2bd80b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Its leading column also serves the lookups by user alone
+    op.create_index('ix_action_user_id_created_at', 'action', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_clip_action_id'), 'clip', ['action_id'], unique=False)
+    op.create_index(op.f('ix_prediction_action_id'), 'prediction', ['action_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_prediction_action_id'), table_name='prediction')
+    op.drop_index(op.f('ix_clip_action_id'), table_name='clip')
+    op.drop_index('ix_action_user_id_created_at', table_name='action')
@@ -0,0 +1,29 @@
+"""Add clip duration
+
+Revision ID: 9a4c7e3f1d2b
+Revises: 5b8d2e61c4a9
+Create Date: 2026-10-18 13:05:52.619044
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a4c7e3f1d2b'
+down_revision: Union[str, None] = '5b8d2e61c4a9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Filled in on upload, clips uploaded before stay without a duration
+    op.add_column('clip', sa.Column('duration_seconds', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('clip', 'duration_seconds')
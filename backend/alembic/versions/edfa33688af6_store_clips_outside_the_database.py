@@ -0,0 +1,66 @@
+"""Store clips outside the database
+
+Revision ID: edfa33688af6
+Revises: ee2015c3f0b1
+Create Date: 2026-10-18 09:41:37.205519
+
+"""
+import os
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'edfa33688af6'
+down_revision: Union[str, None] = 'ee2015c3f0b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Directory of the local clip store, and its layout at this revision
+CLIP_STORAGE_DIR = os.getenv(
+    "CLIP_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "storage", "clips"),
+)
+
+clip = sa.table(
+    'clip',
+    sa.column('id', sa.Integer),
+    sa.column('content', sa.LargeBinary),
+    sa.column('storage_key', sa.String),
+)
+
+
+def stored_path(key: str) -> str:
+    return os.path.join(CLIP_STORAGE_DIR, key[:2], key)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('clip', sa.Column('storage_key', sa.String(length=255), nullable=True))
+    op.add_column('clip', sa.Column('size_bytes', sa.Integer(), nullable=True))
+    op.alter_column('clip', 'content', existing_type=sa.LargeBinary(), nullable=True)
+
+
+def downgrade() -> None:
+    """
+    Downgrade schema. The clips in the store are copied back into
+    clip.content, one at a time, before the column is required again. Fails
+    without changes if a stored clip is missing, its bytes cannot be restored.
+    """
+    bind = op.get_bind()
+
+    rows = bind.execute(
+        sa.select(clip.c.id, clip.c.storage_key).where(clip.c.content.is_(None))
+    ).all()
+    missing = [clip_id for clip_id, key in rows if not key or not os.path.exists(stored_path(key))]
+    if missing:
+        raise RuntimeError(f"Cannot downgrade: the stored videos of clips {missing} are missing")
+    for clip_id, key in rows:
+        with open(stored_path(key), "rb") as f:
+            bind.execute(clip.update().where(clip.c.id == clip_id).values(content=f.read()))
+
+    op.alter_column('clip', 'content', existing_type=sa.LargeBinary(), nullable=False)
+    op.drop_column('clip', 'size_bytes')
+    op.drop_column('clip', 'storage_key')
@@ -0,0 +1,41 @@
+"""Add clip feature table
+
+Revision ID: ee2015c3f0b1
+Revises: 722644abde56
+Create Date: 2026-10-18 09:20:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ee2015c3f0b1'
+down_revision: Union[str, None] = '722644abde56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'clip_feature',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('clip_id', sa.Integer(), nullable=False),
+        sa.Column('backbone', sa.String(length=32), nullable=False),
+        sa.Column('model_version', sa.String(length=64), nullable=False),
+        sa.Column('dim', sa.Integer(), nullable=False),
+        sa.Column('vector', sa.LargeBinary(), nullable=False),
+        sa.ForeignKeyConstraint(['clip_id'], ['clip.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('clip_id', 'backbone', 'model_version'),
+    )
+    op.create_index(op.f('ix_clip_feature_clip_id'), 'clip_feature', ['clip_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_clip_feature_clip_id'), table_name='clip_feature')
+    op.drop_table('clip_feature')
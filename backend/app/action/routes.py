@@ -1,17 +1,71 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import BinaryIO, List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.models import Prediction, User, Action, Clip
-from app.db.database import get_db
-from app.auth.jwt_utils import get_current_user
-import base64
+from app.db.models import Prediction, User, Action, Clip, ClipFeature
+from app.db.database import get_async_db
+from app.auth.jwt_utils import get_current_user, create_clip_token, verify_token
+from app.storage.clip_store import clip_store, ClipTooLarge, CLIP_MAX_BYTES
+import hashlib
+import io
 
 router = APIRouter()
 
+# Bytes sent at a time when streaming a clip
+STREAM_CHUNK_SIZE = 256 * 1024
+
+# Columns listed for each clip of an action, the video bytes are never loaded
+CLIP_METADATA_COLUMNS = (Clip.id, Clip.size_bytes, Clip.sha256, Clip.duration_seconds)
+
+def probe_duration(key: str) -> Optional[float]:
+    """Duration of a stored clip, None if it is not a readable video."""
+    # cv2 is only imported once a clip is uploaded
+    from app.models.frames import video_duration
+
+    return video_duration(clip_store.local_path(key) or clip_store.read(key))
+
+def replace_action(db: Session, user_id: int, stored_clips: list, durations: list) -> int:
+    """
+    Deletes the actions of a user, with their clips and predictions, and
+    creates a new action with the given clips, in a single transaction. The
+    number of statements does not depend on how many actions the user had.
+    Returns the id of the new action. The stored videos of the deleted clips
+    are left to the clip sweep (app/storage/sweep.py).
+    Synchronous, the upload runs it on its async session with run_sync.
+    """
+    previous_actions = select(Action.id).where(Action.user_id == user_id)
+    # Deleted explicitly since SQLite does not enforce the ON DELETE CASCADE of clip_feature
+    previous_clips = select(Clip.id).where(Clip.action_id.in_(previous_actions))
+    db.query(ClipFeature).filter(ClipFeature.clip_id.in_(previous_clips)).delete(synchronize_session=False)
+    db.query(Prediction).filter(Prediction.action_id.in_(previous_actions)).delete(synchronize_session=False)
+    db.query(Clip).filter(Clip.action_id.in_(previous_actions)).delete(synchronize_session=False)
+    db.query(Action).filter(Action.user_id == user_id).delete(synchronize_session=False)
+
+    action = Action(user_id=user_id)
+    db.add(action)
+    db.flush()
+    action_id = action.id
+    # A single executemany, even when some clips have no duration
+    db.execute(insert(Clip).execution_options(render_nulls=True), [
+        {
+            "action_id": action_id,
+            "storage_key": stored.key,
+            "size_bytes": stored.size,
+            "sha256": stored.sha256,
+            "duration_seconds": duration,
+        }
+        for stored, duration in zip(stored_clips, durations)
+    ])
+    db.commit()
+    return action_id
+
 @router.post("/upload")
 async def upload_clips(
     files: List[UploadFile] = File(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ):
     # Validate the number of files
@@ -21,64 +75,166 @@ async def upload_clips(
             detail="An action must have between 2 and 4 clips."
         )
 
-    # 1. Deletes existing actions from the user
-    previous_actions = db.query(Action).filter(Action.user_id == current_user.id).all()
-    for action in previous_actions:
-        db.query(Prediction).filter(Prediction.action_id == action.id).delete()
-        db.query(Clip).filter(Clip.action_id == action.id).delete()
-    db.query(Action).filter(Action.user_id == current_user.id).delete()
-    db.commit()
+    # 1. Streams the clips to the clip store, checking their size on the way.
+    # Videos of a failed upload are left to the clip sweep, another upload
+    # may be about to reference the same video
+    stored_clips = []
+    try:
+        for file in files:
+            stored_clips.append(await clip_store.save_upload(file, CLIP_MAX_BYTES))
+    except ClipTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Each clip must be at most {CLIP_MAX_BYTES // (1024 * 1024)} MB."
+        )
 
-    # 2. Creates a new action and associates clips with it
-    action = Action(user_id=current_user.id)
-    db.add(action)
-    db.commit()
-    db.refresh(action)
+    # 2. Reads the duration of each clip, off the event loop
+    durations = [await run_in_threadpool(probe_duration, stored.key) for stored in stored_clips]
 
-    for file in files:
-        content = await file.read()
-        clip = Clip(
-            action_id=action.id,
-            content=content
-        )
-        db.add(clip)
+    # 3. Replaces the previous actions of the user with the new one
+    action_id = await db.run_sync(replace_action, current_user.id, stored_clips, durations)
+    return {"message": "Clips uploaded successfully.", "action_id": action_id}
 
-    db.commit()
-    return {"message": "Clips uploaded successfully.", "action_id": action.id}
+def clip_metadata(request: Request, clip) -> dict:
+    """Listing entry of a clip, from a row of CLIP_METADATA_COLUMNS."""
+    url = request.url_for("stream_clip", clip_id=clip.id).include_query_params(token=create_clip_token(clip.id))
+    return {
+        "id": clip.id,
+        "size_bytes": clip.size_bytes,
+        "sha256": clip.sha256,
+        "duration_seconds": clip.duration_seconds,
+        "url": str(url),
+    }
 
 @router.get("/action/last")
-def get_last_action(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    action = db.query(Action).filter(Action.user_id == current_user.id).order_by(Action.created_at.desc()).first()
-    if not action:
+async def get_last_action(request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    action_id = await db.scalar(
+        select(Action.id).where(Action.user_id == current_user.id).order_by(Action.created_at.desc()).limit(1)
+    )
+    if not action_id:
         raise HTTPException(status_code=404, detail="No actions found for this user.")
 
-    clips = db.query(Clip).filter(Clip.action_id == action.id).all()
+    clips = await db.execute(select(*CLIP_METADATA_COLUMNS).where(Clip.action_id == action_id).order_by(Clip.id))
     return {
-        "action_id": action.id,
-        "clips": [
-            {
-                "id": clip.id,
-                "content": base64.b64encode(clip.content).decode('utf-8')
-            }
-            for clip in clips
-        ]
+        "action_id": action_id,
+        "clips": [clip_metadata(request, clip) for clip in clips]
     }
 
 @router.get("/action/{action_id}")
-def get_action_clips(action_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    action = db.query(Action).filter(Action.id == action_id, Action.user_id == current_user.id).first()
-    if not action:
+async def get_action_clips(action_id: int, request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_user)):
+    owned = await db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == current_user.id))
+    if not owned:
         raise HTTPException(status_code=404, detail="Action not found or you do not have permission to access it.")
 
-    clips = db.query(Clip).filter(Clip.action_id == action.id).all()
+    clips = await db.execute(select(*CLIP_METADATA_COLUMNS).where(Clip.action_id == action_id).order_by(Clip.id))
     
     return {
-        "action_id": action.id,
-        "clips": [
-            {
-                "id": clip.id,
-                "content": base64.b64encode(clip.content).decode('utf-8')
-            }
-            for clip in clips
-        ]
-    }
\ No newline at end of file
+        "action_id": action_id,
+        "clips": [clip_metadata(request, clip) for clip in clips]
+    }
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(range_header: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    Parses a single "bytes=start-end" range into inclusive offsets. Returns
+    None for Range headers that are ignored and answered with the whole clip:
+    other units, multiple ranges and invalid syntax. Raises
+    RangeNotSatisfiable for a valid range outside the clip, e.g. any range
+    of an empty clip.
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return None
+    start, _, end = spec.strip().partition("-")
+    try:
+        if not start:
+            # Suffix range: the last `end` bytes
+            length = int(end)
+            if length < 0:
+                return None
+            if length == 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - length), size - 1
+        start = int(start)
+        end = int(end) if end else None
+    except ValueError:
+        return None
+    if start < 0 or (end is not None and start > end):
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, size - 1 if end is None else min(end, size - 1)
+
+def iter_clip(source: BinaryIO, start: int, length: int):
+    # A plain generator: StreamingResponse iterates it in the threadpool, so reads never block the event loop
+    with source:
+        source.seek(start)
+        while length > 0:
+            chunk = source.read(min(STREAM_CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@router.get("/clips/{clip_id}/stream", name="stream_clip")
+async def stream_clip(
+    clip_id: int,
+    token: str,
+    range_header: Optional[str] = Header(None, alias="range"),
+    if_none_match: Optional[str] = Header(None),
+    if_range: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+):
+    payload = verify_token(token)
+    if not payload or payload.get("clip") != clip_id:
+        raise HTTPException(status_code=401, detail="Invalid or expired clip token")
+
+    clip = (await db.execute(select(Clip.storage_key, Clip.size_bytes, Clip.sha256).where(Clip.id == clip_id))).first()
+    if not clip:
+        raise HTTPException(status_code=404, detail="Clip not found.")
+
+    if clip.storage_key:
+        # Opened off the event loop, the store may be slow to answer
+        try:
+            source = await run_in_threadpool(clip_store.open, clip.storage_key)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Clip not found.")
+        size = clip.size_bytes
+        etag = f'"{clip.sha256}"'
+    else:
+        # Legacy clip whose bytes are still in the database
+        content = await db.scalar(select(Clip.content).where(Clip.id == clip_id))
+        if content is None:
+            raise HTTPException(status_code=404, detail="Clip not found.")
+        source = io.BytesIO(content)
+        size = len(content)
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Cache-Control": "private, max-age=3600",
+    }
+
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        source.close()
+        return Response(status_code=304, headers=headers)
+
+    # Serve the requested range, unless If-Range says the client copy is stale.
+    # Range headers that are not supported are ignored and the whole clip is sent
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            source.close()
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        if byte_range is not None:
+            start, end = byte_range
+            headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+            headers["Content-Length"] = str(end - start + 1)
+            return StreamingResponse(iter_clip(source, start, end - start + 1), status_code=206, media_type="video/mp4", headers=headers)
+
+    headers["Content-Length"] = str(size)
+    return StreamingResponse(iter_clip(source, 0, size), media_type="video/mp4", headers=headers)
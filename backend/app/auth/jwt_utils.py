@@ -1,13 +1,15 @@
 from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt, ExpiredSignatureError
-from app.db.database import get_db
+from app.db.database import get_async_db
 from app.db.models import User
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends, HTTPException, Header
 
 SECRET_KEY = "your-secret-key"  # Replace with a secure random key in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+CLIP_TOKEN_WINDOW_MINUTES = 60
 
 def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode = data.copy()
@@ -15,6 +17,17 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def create_clip_token(clip_id: int) -> str:
+    """
+    Token granting access to the video of a clip, so it can be used in a
+    <video> URL. The expiration is rounded to a fixed window, which keeps the
+    URL (and the browser cache entry) stable between views.
+    """
+    window = CLIP_TOKEN_WINDOW_MINUTES * 60
+    now = int(datetime.now(timezone.utc).timestamp())
+    expire = (now // window + 2) * window
+    return jwt.encode({"clip": clip_id, "exp": expire}, SECRET_KEY, algorithm=ALGORITHM)
+
 def verify_token(token: str):
     try:
         payload = jwt.decode(
@@ -29,9 +42,9 @@ def verify_token(token: str):
     except JWTError:
         return None  # Invalid token
     
-def get_current_user(
+async def get_current_user(
     authorization: str = Header(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> User:
     scheme, _, token = authorization.partition(" ")
     if scheme.lower() != "bearer" or not token:
@@ -42,7 +55,7 @@ def get_current_user(
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
     email = payload["sub"]
-    user = db.query(User).filter(User.email == email).first()
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
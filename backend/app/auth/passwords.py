@@ -0,0 +1,81 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from passlib.context import CryptContext
+
+# bcrypt cost factor of new hashes; weaker stored hashes are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# Threads hashing passwords at the same time in this worker
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+# Hashes waiting for a free thread before new logins are rejected
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+# Hashes below BCRYPT_ROUNDS need an update, stronger ones are kept as they are
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated pool of threads, so a burst of logins
+    neither blocks the event loop nor takes the threads other requests
+    need. Rejects new work once the queue is full.
+    """
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_size: int = PASSWORD_HASH_QUEUE_SIZE,
+    ):
+        self.context = context
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+        self._max_queued = 0
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, Optional[str]]:
+        """Checks a password. Also returns a new hash when the stored one uses an outdated cost, None otherwise."""
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "active": min(self._pending, self.workers),
+                "queued": max(self._pending - self.workers, 0),
+                "max_queued": self._max_queued,
+                "rejected": self._rejected,
+            }
+
+    async def _run(self, fn: Callable[..., Any], *args) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise PasswordHasherBusy()
+            self._pending += 1
+            self._max_queued = max(self._max_queued, self._pending - self.workers)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+
+password_hasher = PasswordHasher()
@@ -2,43 +2,57 @@ from fastapi import APIRouter, HTTPException, Depends, UploadFile, File
 from app.auth.schemas import UserLogin, UserRegister
 from fastapi.security import OAuth2PasswordRequestForm
 from typing import List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models import User, Action, Clip
-from app.db.database import get_db
-from passlib.context import CryptContext
+from app.db.database import get_async_db
+from app.auth.passwords import PasswordHasherBusy, password_hasher
 from app.auth.jwt_utils import create_access_token, get_current_user
 from datetime import timedelta
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == form_data.username).first()
-    if not user or not pwd_context.verify(form_data.password, user.password):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = await db.scalar(select(User).where(User.email == form_data.username))
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect username or password")
+
+    # bcrypt runs on the password hashing pool, off the event loop
+    try:
+        valid, new_hash = await password_hasher.verify_and_update(form_data.password, user.password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=429, detail="Too many logins in progress. Try again later.")
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect username or password")
 
+    # Hashes with an outdated bcrypt cost are replaced while the password is at hand
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+
     token = create_access_token(data={"sub": user.email}, expires_delta=timedelta(minutes=30))
     return {"access_token": token, "token_type": "bearer"}
 
 @router.post("/register")
-async def register(user: UserRegister, db: Session = Depends(get_db)):
+async def register(user: UserRegister, db: AsyncSession = Depends(get_async_db)):
     if user.password != user.confirm_password:
         raise HTTPException(status_code=400, detail="Passwords do not match.")
     
     # Check if the email already exists in the database
-    existing_user = db.query(User).filter(User.email == user.email).first()
+    existing_user = await db.scalar(select(User.id).where(User.email == user.email))
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered.")
     
-    hashed_password = pwd_context.hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=429, detail="Too many registrations in progress. Try again later.")
     user.password = hashed_password
     
     # Create a new user and add to the database
     new_user = User(email=user.email, password=user.password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
 
     return {"message": "User registered successfully.", "email": new_user.email}   
\ No newline at end of file
@@ -1,4 +1,5 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from dotenv import load_dotenv
@@ -9,13 +10,62 @@ DATABASE_URL = os.getenv("DB_URL")
 if not DATABASE_URL:
     raise ValueError("DB_URL is not set in the environment variables")
 
-engine = create_engine(DATABASE_URL)
+# Each API worker holds two pools: the async one of the routes and the sync one
+# of the prediction jobs and the clip sweep. A worker opens at most
+# DB_POOL_SIZE + DB_MAX_OVERFLOW + DB_SYNC_POOL_SIZE + DB_SYNC_MAX_OVERFLOW connections
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+# The sync pool only serves PREDICT_WORKERS jobs and the sweep at a time
+DB_SYNC_POOL_SIZE = int(os.getenv("DB_SYNC_POOL_SIZE", 2))
+DB_SYNC_MAX_OVERFLOW = int(os.getenv("DB_SYNC_MAX_OVERFLOW", 2))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 30))
+# Seconds after which a connection is replaced, before the server drops it (-1 never)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+# Test each connection when it is checked out, to survive database restarts
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+def engine_options(url: str, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW) -> dict:
+    """Pool settings of the engine. SQLite connections are local and keep the default pool size."""
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(pool_size=pool_size, max_overflow=max_overflow, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+# Async drivers of the databases, used by the API routes
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+def async_url(url: str) -> str:
+    """`url` with the async driver of its database."""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername)
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DB_URL") or async_url(DATABASE_URL)
+
+# Synchronous engine of the prediction job workers, scripts and migrations
+engine = create_engine(
+    DATABASE_URL, **engine_options(DATABASE_URL, pool_size=DB_SYNC_POOL_SIZE, max_overflow=DB_SYNC_MAX_OVERFLOW)
+)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine of the API routes, so waiting on the database never blocks the event loop
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL))
+
+# Objects stay usable after a commit: lazy refreshes are not possible in async code
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def get_engine():
+    """Engine given to the synchronous prediction jobs enqueued by the routes."""
+    return engine
\ No newline at end of file
@@ -1,5 +1,5 @@
-from typing import List
-from sqlalchemy import ForeignKey, String, Enum, DateTime, func, Float, LargeBinary
+from typing import List, Optional
+from sqlalchemy import ForeignKey, String, Enum, DateTime, func, Float, LargeBinary, Integer, UniqueConstraint, Index
 from sqlalchemy.types import JSON
 import enum
 from sqlalchemy.orm import declarative_base, Mapped, mapped_column, relationship
@@ -29,6 +29,8 @@ class User(Base):
     
 class Action(Base):
     __tablename__ = "action"
+    # Serves the lookups by user and the latest action of a user
+    __table_args__ = (Index("ix_action_user_id_created_at", "user_id", "created_at"),)
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("user_account.id"))
     user: Mapped["User"] = relationship(back_populates="actions")
@@ -48,17 +50,44 @@ class Action(Base):
 class Clip(Base):
     __tablename__ = "clip"
     id: Mapped[int] = mapped_column(primary_key=True)
-    action_id: Mapped[int] = mapped_column(ForeignKey("action.id"))
+    action_id: Mapped[int] = mapped_column(ForeignKey("action.id"), index=True)
     action: Mapped["Action"] = relationship(back_populates="clips")
-    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    # Legacy storage of the video bytes, new clips live in the clip store.
+    # Deferred: only loaded when the attribute is accessed
+    content: Mapped[Optional[bytes]] = mapped_column(LargeBinary, nullable=True, deferred=True)
+    storage_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    size_bytes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    sha256: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    duration_seconds: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    features: Mapped[List["ClipFeature"]] = relationship(
+        back_populates="clip", cascade="all, delete-orphan", passive_deletes=True
+    )
 
     def __repr__(self) -> str:
         return f"Clip(id={self.id!r}, action_id={self.action_id!r})"
+
+class ClipFeature(Base):
+    __tablename__ = "clip_feature"
+    __table_args__ = (UniqueConstraint("clip_id", "backbone", "model_version"),)
+    id: Mapped[int] = mapped_column(primary_key=True)
+    clip_id: Mapped[int] = mapped_column(ForeignKey("clip.id", ondelete="CASCADE"), index=True)
+    clip: Mapped["Clip"] = relationship(back_populates="features")
+
+    # Backbone that produced the vector and the version of its weights/preprocessing
+    backbone: Mapped[str] = mapped_column(String(32), nullable=False)
+    model_version: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    # Feature vector stored as float32 bytes
+    dim: Mapped[int] = mapped_column(Integer, nullable=False)
+    vector: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"ClipFeature(id={self.id!r}, clip_id={self.clip_id!r}, backbone={self.backbone!r})"
     
 class Prediction(Base):
     __tablename__ = "prediction"
     id: Mapped[int] = mapped_column(primary_key=True)
-    action_id: Mapped[int] = mapped_column(ForeignKey("action.id"))
+    action_id: Mapped[int] = mapped_column(ForeignKey("action.id"), index=True)
     action: Mapped["Action"] = relationship(back_populates="prediction")
 
     # Foul-related fields
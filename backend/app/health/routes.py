@@ -0,0 +1,23 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.auth.passwords import password_hasher
+from app.models import runtime
+
+router = APIRouter()
+
+@router.get("/health/ready")
+def readiness():
+    # Reports the backbones and ensembles loaded in this worker and their load times
+    status = runtime.status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@router.get("/health/startup")
+def startup_profile():
+    # Time spent importing the prediction stack and loading each model
+    return runtime.STARTUP_PROFILE.report()
+
+@router.get("/health/passwords")
+def password_hashing():
+    # Load of the bcrypt pool: hashes running, waiting and rejected
+    return password_hasher.status()
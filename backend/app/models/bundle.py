@@ -0,0 +1,151 @@
+"""
+Offline bundle of the backbone models, so workers start from local disk
+without torch.hub or weight downloads.
+
+A bundle is a directory with one file per backbone and a manifest.json
+recording the format, size and SHA-256 of each file. MViT is stored as a
+state_dict for the torchvision architecture, X3D and SlowFast as traced
+TorchScript graphs, since their architectures live in the pytorchvideo hub
+repository.
+
+Build one (needs network access) and point the workers at it:
+    python -m app.models.bundle build <output_dir> [--version VERSION]
+    python -m app.models.bundle verify <bundle_dir>
+    MODEL_BUNDLE_DIR=<bundle_dir>
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import torch
+
+from app.utils.hashing import file_sha256
+
+MANIFEST_FILE = "manifest.json"
+# Largest difference allowed between a traced graph and its eager model
+TRACE_TOLERANCE = 1e-4
+
+
+class ModelBundleError(Exception):
+    pass
+
+
+def build_bundle(output_dir: str, models: dict[str, tuple], version: str) -> dict:
+    """
+    Writes a bundle with `models`, a dict of name -> (model, format, example
+    inputs), where format is "state_dict" or "torchscript". TorchScript
+    graphs are traced with the example inputs and checked against the eager
+    model. Returns the manifest.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {
+        "bundle_version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "torch_version": torch.__version__,
+        "models": {},
+    }
+
+    for name, (model, model_format, example_inputs) in models.items():
+        model.eval()
+        file_name = f"{name}.pt"
+        path = os.path.join(output_dir, file_name)
+        if model_format == "state_dict":
+            torch.save(model.state_dict(), path)
+        elif model_format == "torchscript":
+            with torch.no_grad():
+                traced = torch.jit.trace(model, example_inputs)
+                difference = (traced(*example_inputs) - model(*example_inputs)).abs().max().item()
+            if difference > TRACE_TOLERANCE:
+                raise ModelBundleError(f"Traced {name} differs from the eager model by {difference}")
+            traced.save(path)
+        else:
+            raise ModelBundleError(f"Unknown model format: {model_format}")
+
+        manifest["models"][name] = {
+            "file": file_name,
+            "format": model_format,
+            "size_bytes": os.path.getsize(path),
+            "sha256": file_sha256(path),
+        }
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise ModelBundleError(f"Could not read the manifest of model bundle {bundle_dir}: {e}")
+
+
+def verify_model(bundle_dir: str, name: str, manifest: Optional[dict] = None) -> str:
+    """Checks the size and checksum of a bundled model file. Returns its path."""
+    manifest = manifest or read_manifest(bundle_dir)
+    entry = manifest["models"].get(name)
+    if entry is None:
+        raise ModelBundleError(f"Model {name} is not in bundle {bundle_dir}")
+
+    path = os.path.join(bundle_dir, entry["file"])
+    if not os.path.exists(path) or os.path.getsize(path) != entry["size_bytes"]:
+        raise ModelBundleError(f"Bundled model {name} is missing or truncated: {path}")
+    if file_sha256(path) != entry["sha256"]:
+        raise ModelBundleError(f"Checksum mismatch for bundled model {name}: {path}")
+    return path
+
+
+def load_bundled_model(bundle_dir: str, name: str, architectures: dict[str, Callable[[], Any]]) -> Any:
+    """
+    Loads a backbone from a bundle after verifying its checksum. State dicts
+    are loaded into the architecture built by `architectures[name]`.
+    """
+    manifest = read_manifest(bundle_dir)
+    path = verify_model(bundle_dir, name, manifest)
+    model_format = manifest["models"][name]["format"]
+
+    if model_format == "torchscript":
+        return torch.jit.load(path, map_location="cpu")
+    if model_format == "state_dict":
+        if name not in architectures:
+            raise ModelBundleError(f"No architecture registered for bundled model {name}")
+        model = architectures[name]()
+        model.load_state_dict(torch.load(path, map_location="cpu", weights_only=True))
+        return model
+    raise ModelBundleError(f"Unknown format {model_format} for bundled model {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="download the backbones and write a bundle")
+    build.add_argument("output_dir")
+    build.add_argument("--version", default=datetime.now(timezone.utc).strftime("%Y.%m.%d"))
+    verify = commands.add_parser("verify", help="check the checksums of a bundle")
+    verify.add_argument("bundle_dir")
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        manifest = read_manifest(args.bundle_dir)
+        for name in manifest["models"]:
+            verify_model(args.bundle_dir, name, manifest)
+            print(f"{name}: ok")
+        return
+
+    from app.models import predictor
+
+    models = {}
+    for name, (loader, model_format) in predictor.BUNDLE_FORMATS.items():
+        start = time.perf_counter()
+        models[name] = (loader().cpu(), model_format, predictor.example_backbone_inputs(name))
+        print(f"Loaded {name} in {time.perf_counter() - start:.1f}s")
+    manifest = build_bundle(args.output_dir, models, args.version)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
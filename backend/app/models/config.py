@@ -0,0 +1,66 @@
+"""
+Settings of the prediction pipeline. Kept free of torch, cv2 and xgboost
+imports so the API can read them without loading the model stack.
+"""
+import os
+
+# Backbone execution mode: "sequential" runs MViT, X3D and SlowFast one after
+# another, "concurrent" runs the three forward passes in parallel threads
+EXECUTION_MODE = os.getenv("PREDICT_EXECUTION_MODE", "sequential")
+# torch intra-op threads of the worker in concurrent mode, set once at startup
+# (0 keeps torch's default). The setting is process-wide, not per backbone
+BACKBONE_THREADS = int(os.getenv("PREDICT_BACKBONE_THREADS", max(1, (os.cpu_count() or 1) // 3)))
+
+# How the backbones run: "eager" (default), "compile" (torch.compile) or
+# "int8" (dynamic int8 quantization of the nn.Linear layers, see INT8_BACKBONES)
+INFERENCE_BACKEND = os.getenv("PREDICT_INFERENCE_BACKEND", "eager")
+# Use the channels_last_3d memory format for the backbone weights and inputs
+CHANNELS_LAST = os.getenv("PREDICT_CHANNELS_LAST", "false").lower() == "true"
+
+# Backends whose features differ from the eager ones beyond float rounding.
+# Their feature versions are suffixed so their vectors are never mixed
+# with eager features in the cache or the database
+LOSSY_BACKENDS = {"int8"}
+
+# Backbones the int8 backend quantizes. Dynamic quantization only covers
+# nn.Linear: MViT's attention and MLP blocks. X3D and SlowFast are almost
+# entirely Conv3d, so they keep running eager (and keep their eager features)
+INT8_BACKBONES = {"mvit"}
+
+# The X3D and SlowFast classifiers were trained on BGR frames scaled to [0, 1]
+# without mean/std normalization. Enabling this feeds them RGB frames
+# normalized like MViT's, which requires retraining those classifiers
+NORMALIZE_VIDEO_INPUTS = os.getenv("NORMALIZE_VIDEO_INPUTS", "false").lower() == "true"
+
+# Directory of an offline model bundle (see app/models/bundle.py). When set,
+# the backbones are loaded from it instead of torch.hub / weight downloads
+MODEL_BUNDLE_DIR = os.getenv("MODEL_BUNDLE_DIR", "")
+
+
+def backbone_backend(name: str, backend: str = INFERENCE_BACKEND) -> str:
+    """Backend a backbone actually runs with when `backend` is configured."""
+    if backend == "int8" and name not in INT8_BACKBONES:
+        return "eager"
+    return backend
+
+
+def feature_version(version: str, backend: str = INFERENCE_BACKEND) -> str:
+    """Feature version of a backbone when run with `backend`."""
+    return f"{version}+{backend}" if backend in LOSSY_BACKENDS else version
+
+
+# Version of the features produced by each backbone. Bump it whenever the
+# weights or the preprocessing of a backbone change so cached features expire
+BACKBONE_VERSIONS = {
+    "mvit": feature_version("mvit_v2_s.2", backbone_backend("mvit")),
+    "x3d": feature_version("x3d_s.1" + ("+norm" if NORMALIZE_VIDEO_INPUTS else ""), backbone_backend("x3d")),
+    "slowfast": feature_version(
+        "slowfast_r50.1" + ("+norm" if NORMALIZE_VIDEO_INPUTS else ""), backbone_backend("slowfast")
+    ),
+}
+
+# Classifier ensembles run on the backbone features
+ENSEMBLE_TASKS = ("foul", "severity")
+# How the classifiers of an ensemble are combined: "hard" (share of votes)
+# or "soft" (mean of the predicted probabilities)
+ENSEMBLE_VOTING = os.getenv("PREDICT_ENSEMBLE_VOTING", "hard")
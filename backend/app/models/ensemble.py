@@ -0,0 +1,176 @@
+"""
+Foul and severity classifier ensembles, described by a manifest that maps
+each XGBoost classifier to the backbone whose features it was trained on.
+
+The classifiers are stored in XGBoost's native binary format (.ubj) and run
+through the Booster directly instead of pickled sklearn wrappers. The
+native files are generated from the original pickles with:
+    python -m app.models.ensemble convert
+"""
+import json
+import os
+import pickle
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+
+from app.utils.hashing import file_sha256
+
+if TYPE_CHECKING:
+    import xgboost as xgb
+
+MODELS_DIR = os.path.dirname(__file__)
+ENSEMBLE_MANIFEST = os.getenv("ENSEMBLE_MANIFEST", os.path.join(MODELS_DIR, "ensemble.json"))
+
+
+class EnsembleError(Exception):
+    pass
+
+
+class Classifier:
+    """An XGBoost classifier fed with the features of a single backbone."""
+
+    def __init__(self, name: str, backbone: str, booster: "xgb.Booster", classes: list[int], feature_dim: int):
+        self.name = name
+        self.backbone = backbone
+        self.booster = booster
+        self.classes = np.array(classes)
+        self.feature_dim = feature_dim
+
+    def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """Class probabilities for a [N, feature_dim] batch, as [N, num_classes]."""
+        if features.ndim != 2 or features.shape[1] != self.feature_dim:
+            raise EnsembleError(
+                f"{self.name} expects {self.feature_dim} {self.backbone} features, got shape {features.shape}"
+            )
+        probabilities = self.booster.inplace_predict(features)
+        if probabilities.ndim == 1:
+            # Binary objectives only return the probability of the positive class
+            probabilities = np.stack([1 - probabilities, probabilities], axis=1)
+        return probabilities
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        return self.classes[np.argmax(self.predict_proba(features), axis=1)]
+
+
+VOTING_METHODS = ("hard", "soft")
+
+
+def vote(classifiers: list[Classifier], features: dict[str, np.ndarray], voting: str = "hard", label: str = "Model") -> dict:
+    """
+    Runs each classifier once on the [1, feature_dim] features of its
+    backbone and combines them. "hard" voting gives each class the share
+    of classifiers that predict it, "soft" voting the mean probability.
+    Returns the class percentages and the result of each classifier.
+    """
+    if voting not in VOTING_METHODS:
+        raise ValueError(f"Unknown voting method: {voting}")
+
+    probabilities = np.stack([c.predict_proba(features[c.backbone])[0] for c in classifiers])  # [M, K]
+    predictions = np.argmax(probabilities, axis=1)
+    if voting == "soft":
+        scores = probabilities.mean(axis=0)
+    else:
+        scores = np.bincount(predictions, minlength=probabilities.shape[1]) / len(classifiers)
+
+    classes = classifiers[0].classes
+    return {
+        "percentages": {int(c): float(score * 100) for c, score in zip(classes, scores)},
+        "model_results": [
+            {
+                "model": f"{label} {i + 1}",
+                "backbone": classifier.backbone,
+                "prediction": int(classifier.classes[prediction]),
+                "probabilities": [float(p) for p in probability],
+            }
+            for i, (classifier, prediction, probability) in enumerate(zip(classifiers, predictions, probabilities))
+        ],
+    }
+
+
+def read_manifest(path: str = ENSEMBLE_MANIFEST) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        raise EnsembleError(f"Could not read the ensemble manifest {path}: {e}")
+
+
+def _num_classes(booster: "xgb.Booster") -> int:
+    config = json.loads(booster.save_config())
+    return max(int(config["learner"]["learner_model_param"]["num_class"]), 2)
+
+
+def _load_booster(path: str, model_format: str) -> "xgb.Booster":
+    # Imported here so the API only pays for xgboost when the ensembles load
+    import xgboost as xgb
+
+    if model_format == "xgboost":
+        return xgb.Booster(model_file=path)
+    if model_format == "pickle":
+        with open(path, "rb") as f:
+            return pickle.load(f).get_booster()
+    raise EnsembleError(f"Unknown classifier format: {model_format}")
+
+
+def load_classifier(entry: dict, classes: list[int], base_dir: str) -> Classifier:
+    """Loads and validates the classifier described by a manifest entry."""
+    path = os.path.join(base_dir, entry["file"])
+    if "sha256" in entry and file_sha256(path) != entry["sha256"]:
+        raise EnsembleError(f"Checksum mismatch for classifier {entry['name']}: {path}")
+
+    booster = _load_booster(path, entry.get("format", "xgboost"))
+    if booster.num_features() != entry["feature_dim"]:
+        raise EnsembleError(
+            f"Classifier {entry['name']} takes {booster.num_features()} features, "
+            f"the manifest expects {entry['feature_dim']}"
+        )
+    if _num_classes(booster) != len(classes):
+        raise EnsembleError(f"Classifier {entry['name']} predicts {_num_classes(booster)} classes, expected {len(classes)}")
+
+    return Classifier(entry["name"], entry["backbone"], booster, classes, entry["feature_dim"])
+
+
+def load_ensemble(task: str, manifest_path: str = ENSEMBLE_MANIFEST, manifest: Optional[dict] = None) -> list[Classifier]:
+    """Loads the classifiers of `task` ("foul" or "severity") in parallel, in manifest order."""
+    manifest = manifest or read_manifest(manifest_path)
+    if task not in manifest["ensembles"]:
+        raise EnsembleError(f"Unknown ensemble: {task}")
+    ensemble = manifest["ensembles"][task]
+    base_dir = os.path.dirname(manifest_path)
+
+    backbones = [entry["backbone"] for entry in ensemble["models"]]
+    if len(set(backbones)) != len(backbones):
+        raise EnsembleError(f"Ensemble {task} has several classifiers for the same backbone: {backbones}")
+
+    with ThreadPoolExecutor(max_workers=len(ensemble["models"]) or 1) as executor:
+        return list(executor.map(
+            lambda entry: load_classifier(entry, ensemble["classes"], base_dir),
+            ensemble["models"],
+        ))
+
+
+def convert(manifest_path: str = ENSEMBLE_MANIFEST) -> dict:
+    """Regenerates the native classifier files from their source pickles and updates the checksums."""
+    manifest = read_manifest(manifest_path)
+    base_dir = os.path.dirname(manifest_path)
+    for ensemble in manifest["ensembles"].values():
+        for entry in ensemble["models"]:
+            booster = _load_booster(os.path.join(base_dir, entry["source"]), "pickle")
+            path = os.path.join(base_dir, entry["file"])
+            booster.save_model(path)
+            entry["format"] = "xgboost"
+            entry["sha256"] = file_sha256(path)
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    return manifest
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["convert"]:
+        sys.exit("Usage: python -m app.models.ensemble convert")
+    print(json.dumps(convert(), indent=2))
@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+
+from app.utils.hashing import file_sha256
+
+# Feature vectors kept in memory (each backbone vector is ~1.6 KB)
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", 10000))
+# Optional directory for the on-disk tier, disabled when empty
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", "")
+
+logger = logging.getLogger(__name__)
+
+
+def clip_sha256(source, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a clip given as a path, its bytes or a binary file-like object."""
+    if isinstance(source, (str, os.PathLike)):
+        return file_sha256(source, chunk_size)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: source.read(chunk_size), b""):
+        digest.update(chunk)
+    # Rewind so the decoder reads the clip from the start
+    source.seek(0)
+    return digest.hexdigest()
+
+
+def feature_key(clip_hash: str, backbone: str, version: str) -> str:
+    return f"{clip_hash}-{backbone}-{version}"
+
+
+class FeatureCache:
+    """
+    Content-addressed cache of per-clip backbone features. Keeps the most
+    recently used vectors in memory and, optionally, every vector on disk.
+    """
+
+    def __init__(self, max_entries: int = FEATURE_CACHE_SIZE, disk_dir: str = FEATURE_CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir or None
+        self._entries: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            features = self._entries.get(key)
+            if features is not None:
+                self._entries.move_to_end(key)
+                return features
+
+        features = self._read_disk(key)
+        if features is not None:
+            self._remember(key, features)
+        return features
+
+    def put(self, key: str, features: np.ndarray) -> None:
+        features = np.array(features, dtype=np.float32)
+        self._remember(key, features)
+        self._write_disk(key, features)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _remember(self, key: str, features: np.ndarray) -> None:
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npy")
+
+    def _read_disk(self, key: str) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        try:
+            return np.load(self._disk_path(key))
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key: str, features: np.ndarray) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temporary file first so readers never see partial vectors
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, features)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.warning("Could not write feature cache entry %s", key, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,257 @@
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union
+
+import cv2
+import numpy as np
+
+# A clip can be read from a filesystem path, its bytes or a binary file-like object
+VideoSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+
+class ClipFrames:
+    """
+    Frames of a clip decoded in a single pass and shared by all the
+    feature extractors. Each extractor takes its own view of the buffer.
+
+    Only the frames the views need are kept: `frames` holds the resized
+    frames at the (ascending) clip positions in `indices`, so memory does
+    not grow with the length of the clip.
+    """
+
+    def __init__(
+        self,
+        frames: np.ndarray,
+        samples: np.ndarray,
+        indices: Optional[np.ndarray] = None,
+        num_frames: Optional[int] = None,
+    ):
+        self.frames = frames  # [K, H, W, C] BGR frames resized to frame_size
+        self.samples = samples  # [S, H, W, C] full resolution BGR frames for MViT
+        self.indices = np.arange(len(frames)) if indices is None else indices
+        self.num_frames = len(frames) if num_frames is None else num_frames
+
+    def __len__(self) -> int:
+        return self.num_frames
+
+    def take(self, indices) -> np.ndarray:
+        """
+        Frames at the given clip positions as [T, C, H, W]. Positions past the
+        end map to the last frame, positions that were not kept to the closest
+        kept frame before them.
+        """
+        indices = np.minimum(indices, self.num_frames - 1)
+        rows = np.maximum(np.searchsorted(self.indices, indices, side="right") - 1, 0)
+        return np.transpose(self.frames[rows], (0, 3, 1, 2))
+
+    def head(self, num_frames: int) -> np.ndarray:
+        """First `num_frames` frames as [T, C, H, W], repeating the last one if needed."""
+        if num_frames <= len(self.frames) and self.indices[num_frames - 1] == num_frames - 1:
+            # Contiguous prefix: a view, no copy
+            return np.transpose(self.frames[:num_frames], (0, 3, 1, 2))
+        return self.take(np.arange(num_frames))
+
+    def strided(self, num_frames: int, min_frames: int = 0) -> np.ndarray:
+        """`num_frames` frames evenly spread over the whole clip as [T, C, H, W]."""
+        return self.take(strided_indices(self.num_frames, num_frames, min_frames))
+
+
+def describe_source(source: VideoSource) -> str:
+    """Short description of a video source for error messages."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return f"<{len(source)} bytes in memory>"
+    return f"<{type(source).__name__} stream>"
+
+
+@contextmanager
+def open_video_source(source: VideoSource) -> Iterator[str]:
+    """
+    Yields a path cv2 can open for `source`. Paths are used as they are,
+    in-memory sources are exposed through an anonymous memory file (memfd)
+    so the clip bytes never touch the disk. Platforms without memfd fall
+    back to a temporary file.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+
+    if hasattr(os, "memfd_create"):
+        fd = os.memfd_create("referai-clip")
+        path = f"/proc/self/fd/{fd}"
+    else:
+        fd, path = tempfile.mkstemp(suffix=".mp4")
+
+    try:
+        with os.fdopen(fd, "wb", closefd=False) as f:
+            if isinstance(source, (bytes, bytearray, memoryview)):
+                f.write(source)
+            else:
+                shutil.copyfileobj(source, f)
+        yield path
+    finally:
+        os.close(fd)
+        if not path.startswith("/proc/"):
+            os.remove(path)
+
+
+def video_duration(source: VideoSource) -> Optional[float]:
+    """Duration of a clip in seconds from its container metadata, None if it cannot be read."""
+    with open_video_source(source) as video_path:
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                return None
+            fps = cap.get(cv2.CAP_PROP_FPS)
+            total_frames = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+            return total_frames / fps if fps > 0 and total_frames > 0 else None
+        finally:
+            cap.release()
+
+
+def sample_indices(total_frames: int, start_frame: int, end_frame: int, num_frames: int) -> np.ndarray:
+    """Indices of `num_frames` equidistant frames in [start_frame, end_frame]."""
+    # Ajustar los límites del rango
+    start_frame = max(0, min(start_frame, total_frames - 1))
+    end_frame = max(start_frame, min(end_frame, total_frames - 1))
+    return np.linspace(start_frame, end_frame, num_frames, dtype=int)
+
+
+def iter_frames(cap: cv2.VideoCapture, indices) -> Iterator[tuple[int, np.ndarray]]:
+    """
+    Yields (index, frame) for the frames at `indices` (ascending, repeats
+    allowed) decoding forward from the start of the clip. Skipped frames are
+    only grabbed, so they are never converted, and there are no keyframe
+    seeks. Stops at the first frame that cannot be read.
+    """
+    position = -1
+    frame = None
+    for index in indices:
+        while position < index:
+            if not cap.grab():
+                return
+            position += 1
+            frame = None
+        if frame is None:
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+        yield index, frame
+
+
+def read_frames(cap: cv2.VideoCapture, indices) -> list[np.ndarray]:
+    """Frames at `indices` (ascending, repeats allowed), see iter_frames."""
+    return [frame for _, frame in iter_frames(cap, indices)]
+
+
+def sample_frames(source: VideoSource, start_frame=60, end_frame=80, num_frames=16) -> list[np.ndarray]:
+    """
+    Full resolution BGR frames at `num_frames` equidistant indices in
+    [start_frame, end_frame], read in a single forward pass.
+    """
+    with open_video_source(source) as video_path:
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Error al abrir el video: {describe_source(source)}")
+        try:
+            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            if total_frames == 0:
+                raise ValueError("El video no contiene frames")
+            return read_frames(cap, sample_indices(total_frames, start_frame, end_frame, num_frames))
+        finally:
+            cap.release()
+
+
+def strided_indices(total_frames: int, num_frames: int, min_frames: int = 0) -> np.ndarray:
+    """Indices of `num_frames` frames evenly spread over max(total_frames, min_frames) frames."""
+    total = max(total_frames, min_frames)
+    return np.linspace(0, total - 1, num_frames).astype(int)
+
+
+def decode_clip(
+    source: VideoSource,
+    frame_size=(224, 224),
+    start_frame=60,
+    end_frame=80,
+    num_samples=16,
+    head_frames=32,
+    strided_frames=8,
+) -> ClipFrames:
+    """
+    Decodes a clip once, keeping resized to `frame_size` the first
+    `head_frames` frames and `strided_frames` frames spread over the clip,
+    plus the full resolution frames sampled in [start_frame, end_frame].
+    The clip can be given as a path or in memory.
+
+    The needed positions are worked out from the frame count, the rest of
+    the frames are skipped without conversion, so memory is bounded by the
+    number of kept frames whatever the length of the clip.
+    """
+    with open_video_source(source) as video_path:
+        return _decode_clip(
+            video_path, describe_source(source), frame_size,
+            start_frame, end_frame, num_samples, head_frames, strided_frames,
+        )
+
+
+def _decode_clip(
+    video_path: str, name: str, frame_size, start_frame, end_frame, num_samples, head_frames, strided_frames
+) -> ClipFrames:
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Error al abrir el video: {name}")
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames == 0:
+        cap.release()
+        raise ValueError("El video no contiene frames")
+
+    sample_positions = sample_indices(total_frames, start_frame, end_frame, num_samples)
+    kept_positions = np.union1d(
+        np.arange(min(head_frames, total_frames)),
+        np.minimum(strided_indices(total_frames, strided_frames, head_frames), total_frames - 1),
+    )
+
+    # Preallocated buffers, filled as the clip is decoded
+    frames = np.empty((len(kept_positions), frame_size[1], frame_size[0], 3), dtype=np.uint8)
+    samples = None
+    sample_rows = {}  # clip position -> row of `samples`
+    kept = set(kept_positions.tolist())
+    sample_set = set(sample_positions.tolist())
+    wanted = np.union1d(kept_positions, sample_positions)
+    num_kept = 0
+    last_index = -1
+    for index, frame in iter_frames(cap, wanted):
+        last_index = index
+        if index in kept:
+            cv2.resize(frame, frame_size, dst=frames[num_kept])
+            num_kept += 1
+        if index in sample_set:
+            if samples is None:
+                samples = np.empty((len(sample_set),) + frame.shape, dtype=np.uint8)
+            samples[len(sample_rows)] = frame
+            sample_rows[index] = len(sample_rows)
+
+    # The clip is shorter than its frame count if it ended before the last wanted frame
+    num_frames = total_frames if last_index == wanted[-1] else max(int(cap.get(cv2.CAP_PROP_POS_FRAMES)), last_index + 1)
+    cap.release()
+
+    if num_kept == 0:
+        raise ValueError(f"No se pudieron extraer frames del video: {name}")
+
+    # Keep the sampled frames in order, stopping at the first one past the end
+    rows = []
+    for i in sample_positions:
+        if i not in sample_rows:
+            break
+        rows.append(sample_rows[i])
+    if not rows:
+        # Truncated clip that ends before the MViT window
+        raise ValueError(f"El video termina antes de los frames de MViT: {name}")
+    if rows != list(range(len(samples))):
+        samples = samples[rows]  # Repeated or missing samples
+
+    return ClipFrames(frames[:num_kept], samples, kept_positions[:num_kept], num_frames)
@@ -0,0 +1,47 @@
+from typing import Any, Callable
+
+import torch
+
+from app.models.config import CHANNELS_LAST, INFERENCE_BACKEND
+
+
+def _eager(model):
+    return model
+
+
+def _compile(model):
+    return torch.compile(model)
+
+
+def _int8(model):
+    # Only nn.Linear is quantized: worthwhile for MViT, a no-op for Conv3d backbones
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+INFERENCE_BACKENDS: dict[str, Callable[[Any], Any]] = {
+    "eager": _eager,
+    "compile": _compile,
+    "int8": _int8,
+}
+
+
+def optimize_model(model, backend: str = INFERENCE_BACKEND, channels_last: bool = CHANNELS_LAST):
+    """Prepares an eval mode backbone for inference with the given backend."""
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last_3d)
+    if isinstance(model, torch.jit.ScriptModule):
+        # Traced models from a model bundle: freeze the graph instead of compiling it
+        if backend == "compile":
+            return torch.jit.optimize_for_inference(model)
+        if backend != "eager":
+            raise ValueError(f"Inference backend {backend} does not support TorchScript models")
+    return INFERENCE_BACKENDS[backend](model)
+
+
+def prepare_input(frames: torch.Tensor, channels_last: bool = CHANNELS_LAST) -> torch.Tensor:
+    """Lays out a [N, C, T, H, W] input batch for the configured memory format."""
+    if channels_last:
+        return frames.contiguous(memory_format=torch.channels_last_3d)
+    return frames
@@ -1,37 +1,40 @@
-import os
-import pickle
+import time
 import numpy as np
-from typing import Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 import torch
 import torchvision.models.video as models
-import torchvision.transforms as transforms
-import cv2
-from PIL import Image
 
+from app.models.config import (
+    BACKBONE_VERSIONS,
+    ENSEMBLE_VOTING,
+    EXECUTION_MODE,
+    INFERENCE_BACKEND,
+    MODEL_BUNDLE_DIR,
+)
+from app.models.frames import ClipFrames, decode_clip, describe_source
+from app.models.feature_cache import FeatureCache, clip_sha256, feature_key
+from app.models.bundle import load_bundled_model
+from app.models.ensemble import vote
+from app.models.inference import prepare_input
+from app.models.preprocessing import KINETICS_MEAN, KINETICS_STD, batch_to_tensor, video_input_options
+from app.models.runtime import BACKBONES, ENSEMBLES
 
 
 device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
+# Rango de frames muestreado para MVIT
+MVIT_START_FRAME = 50
+MVIT_END_FRAME = 80
+MVIT_FRAME_SIZE = (224, 224)
+# Frames de X3D y de los flujos de SlowFast
+X3D_FRAMES = 32
+SLOWFAST_SLOW_FRAMES = 8
+SLOWFAST_FAST_FRAMES = 32
 
-#Transformaciones para MVIT
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.45, 0.45, 0.45], std=[0.225, 0.225, 0.225])
-])
-def load_models(model_dir: str) -> list[Any]:
-    """Carga todos los modelos .pkl de una carpeta."""
-    models = []
-    for file in os.listdir(model_dir):
-        if file.endswith(".pkl"):
-            path = os.path.join(model_dir, file)
-            with open(path, "rb") as f:
-                models.append(pickle.load(f))
-    return models
-
-# Cargamos los modelos una sola vez al arrancar
-FOUL_MODELS = load_models(os.path.join(os.path.dirname(__file__), "foul"))
-SEVERITY_MODELS = load_models(os.path.join(os.path.dirname(__file__), "severity"))
+_backbone_executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="backbone")
+
+FEATURE_CACHE = FeatureCache()
 
 def load_x3d_model():
     model = torch.hub.load('facebookresearch/pytorchvideo', 'x3d_s', pretrained=True)
@@ -48,233 +51,264 @@ def load_mvit_model():
     model.eval()
     return model
 
+# How each backbone is stored in a model bundle. MViT's architecture ships
+# with torchvision, X3D and SlowFast are traced since theirs come from torch.hub
+BUNDLE_FORMATS = {
+    "mvit": (load_mvit_model, "state_dict"),
+    "x3d": (load_x3d_model, "torchscript"),
+    "slowfast": (load_slowfast_model, "torchscript"),
+}
+BUNDLE_ARCHITECTURES = {
+    "mvit": models.mvit_v2_s,
+}
 
-def preprocess_video_for_mvit(video_path, start_frame=60, end_frame=80, num_frames=16):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise RuntimeError(f"No se pudo abrir el video: {video_path}")
-    
-    frames = []
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    if total_frames == 0:
-        raise RuntimeError("El video no contiene frames")
-    
-    # Ajustar los límites del rango
-    start_frame = max(0, min(start_frame, total_frames - 1))
-    end_frame = max(start_frame, min(end_frame, total_frames - 1))
-    frame_indices = np.linspace(start_frame, end_frame, num_frames, dtype=int)  # Seleccionar 16 frames equidistantes
-    
-    for i in frame_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = Image.fromarray(frame)
-        frames.append(transform(frame))
-    
-    cap.release()
-    if len(frames) < num_frames:
-        frames += [frames[-1]] * (num_frames - len(frames))  # Rellenar si hay menos de 16 frames
-    
-    frames_tensor = torch.stack(frames).permute(1, 0, 2, 3).unsqueeze(0).to(device)  # (1, 3, 16, 224, 224)
-    return frames_tensor
-
-def preprocess_video_for_x3d(video_path, frame_size=(224, 224), num_frames=32):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"Error al abrir el video: {video_path}")
-        
-    frames = []
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame = cv2.resize(frame, frame_size)
-        frames.append(frame)
-        
-        if len(frames) >= num_frames:
-            break
-
-    cap.release()
-    
-    if len(frames) == 0:
-        raise ValueError(f"No se pudieron extraer frames del video: {video_path}")
-    
-    while len(frames) < num_frames:
-        frames.append(frames[-1])
-    
-    frames = np.array(frames)
-    frames = np.transpose(frames, (0, 3, 1, 2))
-    return frames
+def example_backbone_inputs(name: str, batch_size: int = 2) -> tuple:
+    """Example input batch of a backbone, used to trace it."""
+    if name == "mvit":
+        return (torch.zeros(batch_size, 3, 16, *MVIT_FRAME_SIZE),)
+    if name == "x3d":
+        return (torch.zeros(batch_size, 3, X3D_FRAMES, 224, 224),)
+    if name == "slowfast":
+        return ([
+            torch.zeros(batch_size, 3, SLOWFAST_SLOW_FRAMES, 224, 224),
+            torch.zeros(batch_size, 3, SLOWFAST_FAST_FRAMES, 224, 224),
+        ],)
+    raise KeyError(f"Unknown backbone: {name}")
 
-def preprocess_video_for_slowfast(video_path, frame_size=(224, 224), slow_frames=8, fast_frames=32):
-    
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"Error al abrir el video: {video_path}")
-    
-    frames = []
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frame = cv2.resize(frame, frame_size)
-        frames.append(frame)
-    
-    cap.release()
-    
+def load_backbone(name: str):
+    """Loads a backbone from the model bundle if configured, from its source otherwise."""
+    if not MODEL_BUNDLE_DIR:
+        loader, _ = BUNDLE_FORMATS[name]
+        return loader()
+    model = load_bundled_model(MODEL_BUNDLE_DIR, name, BUNDLE_ARCHITECTURES)
+    return model.to(device) if name == "mvit" else model
+
+
+def preprocess_video_for_mvit(clip: ClipFrames, num_frames=16):
+    frames = clip.samples  # [T, H, W, C] a resolución completa
     if len(frames) == 0:
-        raise ValueError(f"No se pudieron extraer frames del video: {video_path}")
-    
+        raise ValueError("El video no contiene frames para MViT")
+    if len(frames) < num_frames:
+        # Rellenar si hay menos de 16 frames
+        frames = np.concatenate([frames, np.repeat(frames[-1:], num_frames - len(frames), axis=0)])
+    # Resized, converted to RGB and normalized with the rest of the batch
+    return frames.transpose(0, 3, 1, 2)  # [T, C, H, W]
+
+def preprocess_video_for_x3d(clip: ClipFrames, num_frames=X3D_FRAMES):
+    return clip.head(num_frames)  # [T, C, H, W]
+
+def preprocess_video_for_slowfast(clip: ClipFrames, slow_frames=SLOWFAST_SLOW_FRAMES, fast_frames=SLOWFAST_FAST_FRAMES):
     # Asegurar suficientes frames para ambos flujos
-    while len(frames) < fast_frames:
-        frames.append(frames[-1])
-    
-    frames = np.array(frames)
-    frames = np.transpose(frames, (0, 3, 1, 2))  # [T, C, H, W]
-    
-    # Preparar entradas para SlowFast
-    slow_idx = np.linspace(0, len(frames) - 1, slow_frames).astype(int)  # Submuestreo para el flujo lento
-    fast_idx = np.arange(fast_frames)  # Todos los frames para el flujo rápido
-    
-    slow_frames_data = frames[slow_idx]  # Frames para el flujo lento
-    fast_frames_data = frames[fast_idx]  # Frames para el flujo rápido
-    
+    slow_frames_data = clip.strided(slow_frames, min_frames=fast_frames)  # Submuestreo para el flujo lento
+    fast_frames_data = clip.head(fast_frames)  # Todos los frames para el flujo rápido
     return slow_frames_data, fast_frames_data
 
-def extract_features_slowfast(video_path, model):
-    slow_frames, fast_frames = preprocess_video_for_slowfast(video_path)  # Extraer frames para ambos flujos
-    
-    slow_frames = torch.tensor(slow_frames).float() / 255.0  # Normalizar
-    fast_frames = torch.tensor(fast_frames).float() / 255.0  # Normalizar
-    
-    # Ajustar dimensiones: [batch_size, num_channels, num_frames, height, width]
-    slow_frames = slow_frames.unsqueeze(0).permute(0, 2, 1, 3, 4)  # [1, C, T_slow, H, W]
-    fast_frames = fast_frames.unsqueeze(0).permute(0, 2, 1, 3, 4)  # [1, C, T_fast, H, W]
-    
+def prepare_clip(source) -> dict:
+    """
+    Decodes a clip once and builds the input of each backbone from it. The
+    clip can be a path, its bytes or a binary file-like object.
+    """
+    # Only the frames used by the backbones are kept, whatever the length of the clip
+    clip = decode_clip(
+        source,
+        start_frame=MVIT_START_FRAME,
+        end_frame=MVIT_END_FRAME,
+        head_frames=max(X3D_FRAMES, SLOWFAST_FAST_FRAMES),
+        strided_frames=SLOWFAST_SLOW_FRAMES,
+    )
+    return {
+        "mvit": preprocess_video_for_mvit(clip),
+        "x3d": preprocess_video_for_x3d(clip),
+        "slowfast": preprocess_video_for_slowfast(clip),
+    }
+
+def extract_features_slowfast(clips_frames: list, model):
+    # Apilar los clips en un único batch para cada flujo: [N, C, T, H, W]
+    options = video_input_options()
+    slow_frames = batch_to_tensor("slowfast_slow", [slow for slow, _ in clips_frames], **options)
+    fast_frames = batch_to_tensor("slowfast_fast", [fast for _, fast in clips_frames], **options)
+
     # SlowFast espera una lista con los dos flujos
-    inputs = [slow_frames, fast_frames]
-    
-    with torch.no_grad():
+    inputs = [prepare_input(slow_frames), prepare_input(fast_frames)]
+
+    with torch.inference_mode():
         features = model(inputs)
-    
+
     return features.cpu().numpy()
 
-def extract_features_mvit(video_path, start_frame, end_frame, model):
-    frames = preprocess_video_for_mvit(video_path, start_frame, end_frame)
-    with torch.no_grad():
-        features = model(frames)
+def extract_features_mvit(clips_frames: list, model):
+    frames = batch_to_tensor(
+        "mvit", clips_frames, size=MVIT_FRAME_SIZE, rgb=True, mean=KINETICS_MEAN, std=KINETICS_STD
+    )  # (N, 3, 16, 224, 224)
+    with torch.inference_mode():
+        features = model(prepare_input(frames.to(device)))
     return features.cpu().numpy()
 
-def extract_features_x3d(video_path, model):
-    frames = preprocess_video_for_x3d(video_path)  # Extraer frames del video
-    
-    frames = torch.tensor(frames).float() / 255.0  # Normalizar los valores de los frames
-    frames = frames.unsqueeze(0)  # Agregar dimensión de batch
-    frames = frames.permute(0, 2, 1, 3, 4)  # Cambiar el orden de las dimensiones a [batch_size, num_channels, num_frames, height, width]
+def extract_features_x3d(clips_frames: list, model):
+    # Apilar los clips en un único batch [N, C, T, H, W]
+    frames = batch_to_tensor("x3d", clips_frames, **video_input_options())
+
+    with torch.inference_mode():
+        features = model(prepare_input(frames))
 
-    with torch.no_grad():
-        features = model(frames)
-    
     return features.cpu().numpy()
 
-def predict(video_paths: list) -> dict:
-    # Load feature extraction models
-    mvit = load_mvit_model()
-    x3d = load_x3d_model()
-    slowfast = load_slowfast_model()
-
-    # Initialize lists to store action clips
-    action_clips_mvit = []
-    action_clips_x3d = []
-    action_clips_slowfast = []
-
-    # Process each video and extract features
-    for video_path in video_paths:   
-        try:
-            features_mvit = extract_features_mvit(video_path, 50, 80, mvit)
-            features_x3d = extract_features_x3d(video_path, x3d)
-            features_slowfast = extract_features_slowfast(video_path, slowfast)
-
-            action_clips_mvit.append(features_mvit)
-            action_clips_x3d.append(features_x3d)
-            action_clips_slowfast.append(features_slowfast)
-        except Exception as e:
-            print(f"Error while processing video {video_path}: {e}")
-
-    # Calculate mean features for each model
-    action_features = []
-    action_features.append(np.mean(action_clips_mvit, axis=0)) 
-    action_features.append(np.mean(action_clips_x3d, axis=0))
-    action_features.append(np.mean(action_clips_slowfast, axis=0))
-
-    print("Action features shape: ", len(action_features))
+def run_backbones(inputs: dict, backbones: dict, mode: str = EXECUTION_MODE) -> tuple[dict, dict]:
+    """
+    Runs each backbone over its batch of preprocessed clips. Returns the
+    features and the time spent by each backbone, in seconds.
+    """
+    extractors = {
+        "mvit": extract_features_mvit,
+        "x3d": extract_features_x3d,
+        "slowfast": extract_features_slowfast,
+    }
+
+    def run(name):
+        start = time.perf_counter()
+        features = extractors[name](inputs[name], backbones[name])
+        return features, time.perf_counter() - start
+
+    if mode == "concurrent":
+        futures = {
+            name: _backbone_executor.submit(run, name)
+            for name in inputs
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    elif mode == "sequential":
+        results = {name: run(name) for name in inputs}
+    else:
+        raise ValueError(f"Unknown execution mode: {mode}")
+
+    features = {name: result[0] for name, result in results.items()}
+    timings = {name: result[1] for name, result in results.items()}
+    return features, timings
+
+def _prepare_clip(source) -> tuple:
+    """prepare_clip for a decode pool: returns (inputs, None) or (None, error message)."""
+    try:
+        return prepare_clip(source), None
+    except Exception as e:
+        return None, str(e)
+
+def extract_action_features(video_paths: list, known_features: Optional[list] = None, pool=None) -> tuple[list, dict]:
+    """
+    Features of each backbone for every clip of an action. Features already
+    known for a clip (e.g. stored in the database) are reused, the rest are
+    taken from the feature cache or computed. Each clip is given as a path,
+    its bytes or a binary file-like object; a clip whose features are all
+    known does not need a source. The clips may come from several actions,
+    each backbone runs once over all of them.
+
+    Clips are decoded in this process, or in the processes of `pool` (a
+    multiprocessing pool) when given.
+
+    Returns the per-clip features, aligned with `video_paths` and None for the
+    clips that could not be processed, and the extraction metadata.
+    """
+    start = time.perf_counter()
+    known_features = known_features or [None] * len(video_paths)
+
+    clips = []
+    to_decode = []  # (clip index, source) of the clips with missing features
+    stored_hits = cache_hits = 0
+    for video_path, known in zip(video_paths, known_features):
+        features = dict(known or {})
+        stored_hits += len(features)
+        clip_hash = None
+        if len(features) < len(BACKBONE_VERSIONS):
+            try:
+                clip_hash = clip_sha256(video_path)
+            except Exception as e:
+                print(f"Error while processing video {describe_source(video_path)}: {e}")
+                clips.append(None)
+                continue
+            for name, version in BACKBONE_VERSIONS.items():
+                cached = FEATURE_CACHE.get(feature_key(clip_hash, name, version)) if name not in features else None
+                if cached is not None:
+                    features[name] = cached
+                    cache_hits += 1
+
+            # Only decode the clip if some backbone has to run on it
+            if len(features) < len(BACKBONE_VERSIONS):
+                to_decode.append((len(clips), video_path))
+        clips.append({"hash": clip_hash, "features": features})
+
+    sources = [source for _, source in to_decode]
+    decoded = pool.map(_prepare_clip, sources) if pool is not None else map(_prepare_clip, sources)
+    pending = []  # (clip index, preprocessed inputs) of the decoded clips
+    for (i, source), (inputs, error) in zip(to_decode, decoded):
+        if error is not None:
+            print(f"Error while processing video {describe_source(source)}: {error}")
+            clips[i] = None
+        else:
+            pending.append((i, inputs))
+
+    if not any(clips):
+        raise RuntimeError("None of the videos could be processed.")
+    preprocess_time = time.perf_counter() - start
+
+    # Run each backbone once over all the clips missing its features
+    batches = {}
+    for name in BACKBONE_VERSIONS:
+        batch = [(i, inputs[name]) for i, inputs in pending if name not in clips[i]["features"]]
+        if batch:
+            batches[name] = batch
+    backbones = {name: BACKBONES.get(name) for name in batches}
+    features, timings = run_backbones(
+        {name: [inputs for _, inputs in batch] for name, batch in batches.items()},
+        backbones,
+    )
+
+    for name, batch in batches.items():
+        for (i, _), vector in zip(batch, features[name]):
+            clips[i]["features"][name] = vector
+            FEATURE_CACHE.put(feature_key(clips[i]["hash"], name, BACKBONE_VERSIONS[name]), vector)
+
+    metadata = {
+        "num_clips": sum(clip is not None for clip in clips),
+        "stored_hits": stored_hits,
+        "cache_hits": cache_hits,
+        "timings": {"preprocess": preprocess_time, **timings},
+    }
+    return [clip["features"] if clip else None for clip in clips], metadata
+
+def classify_action(clip_features: list) -> dict:
+    """
+    Foul and severity of an action from the backbone features of its clips,
+    as returned by extract_action_features (None for the failed clips).
+    """
+    valid_features = [features for features in clip_features if features is not None]
+    if not valid_features:
+        raise RuntimeError("None of the videos could be processed.")
+
+    # Calculate mean features for each backbone
+    action_features = {}
+    for name in BACKBONE_VERSIONS:
+        action_features[name] = np.mean(np.stack([features[name] for features in valid_features]), axis=0, keepdims=True)
 
     # Verify that all features have been calculated for each 3 models
     if len(action_features) != 3:
         raise RuntimeError("All 3 models should have produced features.")
     
-    foul_preds = []
-    foul_model_results = []
-    for i, model in enumerate(FOUL_MODELS):
-        feature = action_features[i]
-        prediction = model.predict(feature)[0]
-        probabilities = model.predict_proba(feature)[0]
-        print(f"Model {i+1} foul probabilities: {probabilities}")
-        foul_preds.append(prediction)
-        foul_model_results.append({
-            "model": f"Foul Model {i+1}",
-            "prediction": prediction
-        })
-
-    # Calculate the average of the predictions
-    total_foul_preds = len(foul_preds)
-    foul_pct = (foul_preds.count(1)/total_foul_preds) * 100
-    no_foul_pct = (foul_preds.count(0)/total_foul_preds) * 100
+    # One predict_proba per classifier, combined by hard or soft voting
+    foul = vote(ENSEMBLES.get("foul"), action_features, voting=ENSEMBLE_VOTING, label="Foul Model")
+    foul_pct = foul["percentages"][1]
+    no_foul_pct = foul["percentages"][0]
+    foul_model_results = foul["model_results"]
 
     # Calculate the severity predictions only if a foul is detected
     if foul_pct > no_foul_pct:
-        severity_preds = []
-        severity_model_results = []
-        for i, model in enumerate(SEVERITY_MODELS):
-            feature = action_features[i]
-            probabilities = model.predict_proba(feature)[0]
-            prediction = model.predict(feature)[0]
-            print(f"Model {i+1} severity probabilities: {probabilities}")
-            severity_preds.append(prediction)
-            severity_model_results.append({
-                "model": f"Severity Model {i+1}",
-                "prediction": prediction
-            })
-
-        # Calculate the average of the severity predictions
-        total_severity_preds = len(severity_preds)
-        red_card_pct = (severity_preds.count(1)/total_severity_preds) * 100
-        yellow_card_pct = (severity_preds.count(2)/total_severity_preds) * 100
-        no_card_pct = (severity_preds.count(0)/total_severity_preds) * 100
+        severity = vote(ENSEMBLES.get("severity"), action_features, voting=ENSEMBLE_VOTING, label="Severity Model")
+        no_card_pct = severity["percentages"][0]
+        red_card_pct = severity["percentages"][1]
+        yellow_card_pct = severity["percentages"][2]
+        severity_model_results = severity["model_results"]
     else:
         red_card_pct = 0
         yellow_card_pct = 0
         no_card_pct = 100
-
-    # Change the prediction to int
-    foul_model_results = [
-        {
-            "model": result["model"],
-            "prediction": int(result["prediction"])
-        }
-        for result in foul_model_results
-    ]
-
-    # Change the severity predictions to int
-    severity_model_results = [
-        {
-            "model": result["model"],
-            "prediction": int(result["prediction"])
-        }
-        for result in severity_model_results
-    ]
+        severity_model_results = []
 
     return {
         "is_foul": bool(foul_pct > no_foul_pct),
@@ -288,3 +322,30 @@ def predict(video_paths: list) -> dict:
         },
         "severity_model_results": severity_model_results,
     }
+
+def predict(video_paths: list, known_features: Optional[list] = None) -> dict:
+    """
+    Predicts foul and severity for the clips of an action. `known_features`
+    optionally holds, for each clip, the backbone features already computed.
+    The per-clip features are returned in "clip_features".
+    """
+    start = time.perf_counter()
+
+    clip_features, metadata = extract_action_features(video_paths, known_features)
+
+    return {
+        **classify_action(clip_features),
+        "metadata": {
+            "execution_mode": EXECUTION_MODE,
+            "inference_backend": INFERENCE_BACKEND,
+            "voting": ENSEMBLE_VOTING,
+            "num_clips": metadata["num_clips"],
+            "stored_hits": metadata["stored_hits"],
+            "cache_hits": metadata["cache_hits"],
+            "timings": {
+                **metadata["timings"],
+                "total": time.perf_counter() - start,
+            },
+        },
+        "clip_features": clip_features,
+    }
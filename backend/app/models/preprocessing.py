@@ -0,0 +1,83 @@
+import threading
+from typing import Optional
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from app.models.config import NORMALIZE_VIDEO_INPUTS
+
+# Kinetics-400 statistics expected by the video backbones
+KINETICS_MEAN = (0.45, 0.45, 0.45)
+KINETICS_STD = (0.225, 0.225, 0.225)
+
+
+class TensorBuffers:
+    """
+    Float32 input buffers reused across predictions. Each thread gets its
+    own buffers so concurrent backbones and jobs never share memory.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def get(self, name: str, shape: tuple) -> torch.Tensor:
+        buffers = self._local.__dict__.setdefault("buffers", {})
+        buffer = buffers.get(name)
+        if buffer is None or tuple(buffer.shape) != tuple(shape):
+            buffer = torch.empty(shape, dtype=torch.float32)
+            buffers[name] = buffer
+        return buffer
+
+
+INPUT_BUFFERS = TensorBuffers()
+
+
+def frames_to_tensor(
+    frames: np.ndarray,
+    out: torch.Tensor,
+    size: Optional[tuple] = None,
+    rgb: bool = False,
+    mean: Optional[tuple] = None,
+    std: Optional[tuple] = None,
+) -> torch.Tensor:
+    """
+    Writes a [T, C, H, W] uint8 BGR clip into `out`, a [C, T, h, w] float32
+    tensor, as a few whole-clip ops: optional resize to `size`, optional
+    BGR to RGB, scaling to [0, 1] and optional mean/std normalization.
+    The numpy frames are wrapped without copying.
+    """
+    x = torch.from_numpy(frames)
+    if size is not None and tuple(x.shape[-2:]) != tuple(size):
+        # Antialiased bilinear on uint8 frames, like PIL's Resize
+        x = F.interpolate(x, size=size, mode="bilinear", antialias=True, align_corners=False)
+    if rgb:
+        x = x.flip(1)
+
+    # Single copy: uint8 -> float32 straight into the buffer, then in place ops
+    out.copy_(x.permute(1, 0, 2, 3))
+    out.div_(255.0)
+    if mean is not None:
+        out.sub_(torch.tensor(mean).view(-1, 1, 1, 1)).div_(torch.tensor(std).view(-1, 1, 1, 1))
+    return out
+
+
+def batch_to_tensor(name: str, clips: list, size: Optional[tuple] = None, **kwargs) -> torch.Tensor:
+    """
+    Stacks a batch of [T, C, H, W] uint8 clips into the reusable `name` input
+    buffer as [N, C, T, H, W] float32. See frames_to_tensor for the options.
+    """
+    num_frames, channels, height, width = clips[0].shape
+    if size is not None:
+        height, width = size
+    out = INPUT_BUFFERS.get(name, (len(clips), channels, num_frames, height, width))
+    for i, frames in enumerate(clips):
+        frames_to_tensor(frames, out[i], size=size, **kwargs)
+    return out
+
+
+def video_input_options() -> dict:
+    """Colour and normalization options of the X3D and SlowFast inputs."""
+    if NORMALIZE_VIDEO_INPUTS:
+        return {"rgb": True, "mean": KINETICS_MEAN, "std": KINETICS_STD}
+    return {}
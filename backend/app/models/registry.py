@@ -0,0 +1,69 @@
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for the models of a worker (the feature extraction
+    backbones, the classifier ensembles).
+
+    Each model is loaded once (on warm up or on first use) and kept, in eval
+    mode for torch modules, for the lifetime of the worker, so predictions
+    never pay the torch.hub / weight deserialization cost. `prepare`, if given, is called
+    with the name and the model once it is in eval mode (e.g. to compile or quantize it).
+    """
+
+    def __init__(self, loaders: dict[str, Callable[[], Any]], prepare: Optional[Callable[[str, Any], Any]] = None):
+        self._loaders = loaders
+        self._prepare = prepare
+        self._models: dict[str, Any] = {}
+        self._load_times: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def names(self) -> list[str]:
+        return list(self._loaders)
+
+    def get(self, name: str) -> Any:
+        """Returns the model registered under `name`, loading it if needed."""
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+
+        with self._lock:
+            # Another thread may have loaded it while we were waiting
+            if name not in self._models:
+                start = time.perf_counter()
+                model = self._loaders[name]()
+                if hasattr(model, "eval"):
+                    model.eval()
+                if self._prepare is not None:
+                    model = self._prepare(name, model)
+                self._load_times[name] = time.perf_counter() - start
+                self._models[name] = model
+        return self._models[name]
+
+    def warm_up(self) -> None:
+        """Loads every registered model."""
+        for name in self._loaders:
+            self.get(name)
+
+    def is_ready(self) -> bool:
+        return all(name in self._models for name in self._loaders)
+
+    def status(self) -> dict:
+        """Reports which models are loaded and how long each took to load."""
+        return {
+            "ready": self.is_ready(),
+            "models": {
+                name: {
+                    "loaded": name in self._models,
+                    "load_time_seconds": self._load_times.get(name),
+                }
+                for name in self._loaders
+            },
+        }
@@ -0,0 +1,101 @@
+"""
+Single owner of the models loaded in a worker: the feature extraction
+backbones and the foul/severity classifier ensembles.
+
+Importing this module is cheap. torch, torchvision, cv2 and xgboost are only
+imported when a model is first loaded (on warm up or on first use), and
+the startup profile records how long the imports and the loads took.
+"""
+import importlib
+import sys
+import time
+from functools import partial
+
+from app.models.config import BACKBONE_THREADS, BACKBONE_VERSIONS, ENSEMBLE_TASKS, EXECUTION_MODE
+from app.models.ensemble import load_ensemble
+from app.models.registry import ModelRegistry
+
+# Modules imported when the prediction stack starts, heaviest first
+PREDICTION_MODULES = ("torch", "torchvision", "cv2", "xgboost", "app.models.predictor")
+
+
+def _load_backbone(name: str):
+    from app.models.predictor import load_backbone
+
+    return load_backbone(name)
+
+
+def _prepare_backbone(name: str, model):
+    from app.models.config import backbone_backend
+    from app.models.inference import optimize_model
+
+    return optimize_model(model, backend=backbone_backend(name))
+
+
+BACKBONES = ModelRegistry(
+    {name: partial(_load_backbone, name) for name in BACKBONE_VERSIONS},
+    prepare=_prepare_backbone,
+)
+ENSEMBLES = ModelRegistry({task: partial(load_ensemble, task) for task in ENSEMBLE_TASKS})
+
+
+class StartupProfile:
+    """Time spent importing the prediction stack and loading each model."""
+
+    def __init__(self):
+        self.imports: dict[str, float] = {}
+
+    def import_modules(self, modules=PREDICTION_MODULES) -> None:
+        for module in modules:
+            if module in sys.modules:
+                continue
+            start = time.perf_counter()
+            importlib.import_module(module)
+            self.imports[module] = time.perf_counter() - start
+
+    def report(self) -> dict:
+        loads = {
+            **{name: info["load_time_seconds"] for name, info in BACKBONES.status()["models"].items()},
+            **{name: info["load_time_seconds"] for name, info in ENSEMBLES.status()["models"].items()},
+        }
+        return {
+            "imports": self.imports,
+            "loads": loads,
+            "total_import_seconds": sum(self.imports.values()),
+            "total_load_seconds": sum(seconds or 0 for seconds in loads.values()),
+        }
+
+
+STARTUP_PROFILE = StartupProfile()
+
+
+def configure_threads(mode: str = EXECUTION_MODE, threads: int = BACKBONE_THREADS) -> None:
+    """
+    Sets torch's intra-op thread count for concurrent mode. It applies to the
+    whole process, every request included, so it is set once at startup
+    rather than around each forward pass.
+    """
+    if mode == "concurrent" and threads:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def warm_up() -> dict:
+    """Imports the prediction stack and loads every model. Returns the startup profile."""
+    STARTUP_PROFILE.import_modules()
+    configure_threads()
+    ENSEMBLES.warm_up()
+    BACKBONES.warm_up()
+    return STARTUP_PROFILE.report()
+
+
+def status() -> dict:
+    """Readiness of the worker: loaded backbones and ensembles."""
+    backbones = BACKBONES.status()
+    ensembles = ENSEMBLES.status()
+    return {
+        "ready": backbones["ready"] and ensembles["ready"],
+        "models": backbones["models"],
+        "ensembles": ensembles["models"],
+    }
@@ -0,0 +1,49 @@
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.db.models import ClipFeature
+from app.models.config import BACKBONE_VERSIONS
+
+
+def load_clip_features(db: Session, clip_ids: list[int]) -> dict[int, dict[str, np.ndarray]]:
+    """Stored features of the current backbone versions for each clip."""
+    features = {clip_id: {} for clip_id in clip_ids}
+    rows = db.query(ClipFeature).filter(ClipFeature.clip_id.in_(clip_ids)).all()
+    for row in rows:
+        # Features of older backbone versions are ignored and recomputed
+        if BACKBONE_VERSIONS.get(row.backbone) == row.model_version:
+            features[row.clip_id][row.backbone] = np.frombuffer(row.vector, dtype=np.float32)
+    return features
+
+
+def save_clip_features(db: Session, clip_ids: list[int], clip_features: list, stored: dict) -> None:
+    """Adds the features not stored yet to the session, as float32 blobs."""
+    for clip_id, features in zip(clip_ids, clip_features):
+        if features is None:
+            continue
+        for backbone, vector in features.items():
+            if backbone in stored.get(clip_id, {}):
+                continue
+            vector = np.asarray(vector, dtype=np.float32).ravel()
+            db.add(ClipFeature(
+                clip_id=clip_id,
+                backbone=backbone,
+                model_version=BACKBONE_VERSIONS[backbone],
+                dim=vector.size,
+                vector=vector.tobytes(),
+            ))
+
+
+def prediction_values(action_id: int, result: dict) -> dict:
+    """Column values of the Prediction row of an action, from the result of a prediction."""
+    return {
+        "action_id": action_id,
+        "is_foul": result["is_foul"],
+        "foul_confidence": result["foul_confidence"],
+        "no_foul_confidence": result["no_foul_confidence"],
+        "foul_model_results": result["foul_model_results"],  # Serialized as JSON
+        "no_card_confidence": result["severity"]["no_card"],
+        "red_card_confidence": result["severity"]["red_card"],
+        "yellow_card_confidence": result["severity"]["yellow_card"],
+        "severity_model_results": result["severity_model_results"],  # Serialized as JSON
+    }
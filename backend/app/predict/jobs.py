@@ -0,0 +1,103 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+# Number of predictions that run at the same time in this worker
+PREDICT_WORKERS = int(os.getenv("PREDICT_WORKERS", 1))
+# Jobs waiting for a free worker before new submissions are rejected
+PREDICT_QUEUE_SIZE = int(os.getenv("PREDICT_QUEUE_SIZE", 8))
+# Seconds a finished job is kept so its result can be polled
+PREDICT_JOB_TTL = int(os.getenv("PREDICT_JOB_TTL", 3600))
+# Error shown to clients; the details of the exception are only logged
+JOB_FAILED_MESSAGE = "The prediction failed. Try again later."
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class Job:
+    def __init__(self, user_id: int, action_id: int):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.action_id = action_id
+        self.status = "queued"
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "action_id": self.action_id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs blocking prediction work on a bounded pool of threads so it never
+    blocks the event loop. Rejects new jobs once the queue is full.
+    """
+
+    def __init__(self, workers: int = PREDICT_WORKERS, queue_size: int = PREDICT_QUEUE_SIZE, ttl: int = PREDICT_JOB_TTL):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="predict")
+        self._jobs: dict[str, Job] = {}
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], *args, user_id: int, action_id: int) -> Job:
+        """Queues `fn(*args)` and returns its job. Raises JobQueueFull when there is no room left."""
+        with self._lock:
+            self._prune()
+            if self._active >= self.workers + self.queue_size:
+                raise JobQueueFull()
+            job = Job(user_id=user_id, action_id=action_id)
+            self._jobs[job.id] = job
+            self._active += 1
+
+        self._executor.submit(self._run, job, fn, *args)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, fn: Callable[..., Any], *args) -> None:
+        job.status = "running"
+        try:
+            job.result = fn(*args)
+            job.status = "completed"
+        except Exception:
+            logger.exception("Prediction job %s of action %s failed", job.id, job.action_id)
+            job.error = JOB_FAILED_MESSAGE
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._active -= 1
+
+    def _prune(self) -> None:
+        # Forget finished jobs nobody polled within the TTL
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+jobs = JobManager()
@@ -0,0 +1,175 @@
+"""
+Re-predicts the stored actions, e.g. after a classifier update:
+    python -m app.predict.rescore [--page-size 16] [--workers 4] [--checkpoint rescore.json]
+
+Actions are read from the database in pages, in id order. The clips of a
+page are decoded by a pool of processes and each backbone runs once over
+all of them. The predictions of a page replace the previous ones in a
+single transaction. With a checkpoint file, an interrupted run resumes
+after the last committed page. An action that cannot be predicted is
+logged and counted as failed, it keeps its previous prediction.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.db.models import Action, Clip, Prediction
+from app.models.config import BACKBONE_VERSIONS
+from app.predict.features import load_clip_features, prediction_values, save_clip_features
+from app.storage.clip_store import clip_source
+
+# Actions predicted together; all their clips go through the backbones in one batch
+RESCORE_PAGE_SIZE = int(os.getenv("RESCORE_PAGE_SIZE", 16))
+
+logger = logging.getLogger(__name__)
+
+
+def read_checkpoint(path: Optional[str]) -> dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"last_action_id": 0, "rescored": 0, "failed": 0, "skipped": 0}
+
+
+def write_checkpoint(path: Optional[str], checkpoint: dict) -> None:
+    if not path:
+        return
+    # Written aside and renamed so an interruption never leaves a partial file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+def rescore_page(db: Session, action_ids: list[int], pool=None) -> dict:
+    """Predicts the actions of a page and replaces their predictions. Returns the page counts."""
+    from app.models.predictor import classify_action, extract_action_features
+
+    clips = db.query(Clip).filter(Clip.action_id.in_(action_ids)).order_by(Clip.action_id, Clip.id).all()
+    clip_ids = [clip.id for clip in clips]
+    stored_features = load_clip_features(db, clip_ids)
+
+    # Clips whose features are all stored are not decoded again
+    video_sources = [
+        None if len(stored_features[clip.id]) == len(BACKBONE_VERSIONS) else clip_source(clip)
+        for clip in clips
+    ]
+    known_features = [stored_features[clip_id] for clip_id in clip_ids]
+    try:
+        clip_features, _ = extract_action_features(video_sources, known_features, pool=pool)
+    except Exception:
+        # Retried action by action, so a single bad action does not fail the page
+        logger.exception("Actions %s-%s: batch extraction failed", action_ids[0], action_ids[-1])
+        clip_features = [None] * len(clips)
+        for action_id in action_ids:
+            positions = [i for i, clip in enumerate(clips) if clip.action_id == action_id]
+            if not positions:
+                continue
+            try:
+                action_features, _ = extract_action_features(
+                    [video_sources[i] for i in positions], [known_features[i] for i in positions], pool=pool
+                )
+            except Exception:
+                logger.exception("Action %s: feature extraction failed", action_id)
+                continue
+            for i, features in zip(positions, action_features):
+                clip_features[i] = features
+
+    features_by_action = {action_id: [] for action_id in action_ids}
+    for clip, features in zip(clips, clip_features):
+        features_by_action[clip.action_id].append(features)
+
+    rows = []
+    failed = skipped = 0
+    for action_id, features in features_by_action.items():
+        if not features:
+            skipped += 1
+            continue
+        try:
+            rows.append(prediction_values(action_id, classify_action(features)))
+        except Exception:
+            # The previous prediction of the action is kept
+            logger.exception("Action %s: prediction failed", action_id)
+            failed += 1
+
+    save_clip_features(db, clip_ids, clip_features, stored_features)
+    if rows:
+        db.query(Prediction).filter(
+            Prediction.action_id.in_([row["action_id"] for row in rows])
+        ).delete(synchronize_session=False)
+        db.execute(insert(Prediction), rows)
+    db.commit()
+    return {"rescored": len(rows), "failed": failed, "skipped": skipped}
+
+
+def rescore(bind, page_size: int = RESCORE_PAGE_SIZE, pool=None, checkpoint_path: Optional[str] = None) -> dict:
+    """
+    Re-predicts every action after the one recorded in the checkpoint, page by
+    page. The checkpoint is updated after each committed page. Returns it.
+    """
+    checkpoint = read_checkpoint(checkpoint_path)
+    db = Session(bind=bind)
+    try:
+        while True:
+            start = time.perf_counter()
+            action_ids = db.scalars(
+                select(Action.id)
+                .where(Action.id > checkpoint["last_action_id"])
+                .order_by(Action.id)
+                .limit(page_size)
+            ).all()
+            if not action_ids:
+                return checkpoint
+
+            counts = rescore_page(db, action_ids, pool)
+            for key, count in counts.items():
+                checkpoint[key] += count
+            checkpoint["last_action_id"] = action_ids[-1]
+            write_checkpoint(checkpoint_path, checkpoint)
+            db.expunge_all()
+
+            print(
+                f"Actions {action_ids[0]}-{action_ids[-1]}: {counts['rescored']} rescored, "
+                f"{counts['failed']} failed, {counts['skipped']} without clips "
+                f"in {time.perf_counter() - start:.1f}s"
+            )
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=RESCORE_PAGE_SIZE, help="actions predicted together")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes decoding the clips")
+    parser.add_argument("--checkpoint", help="progress file, the run resumes from it if it exists")
+    parser.add_argument("--restart", action="store_true", help="ignore the progress in the checkpoint")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+
+    if args.restart and args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    from app.db.database import engine
+    from app.models import runtime
+
+    # Spawned so the decode processes do not inherit the threads of torch
+    pool = multiprocessing.get_context("spawn").Pool(args.workers) if args.workers > 1 else None
+    try:
+        print(json.dumps(runtime.warm_up(), indent=2))
+        checkpoint = rescore(engine, args.page_size, pool, args.checkpoint)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print(json.dumps(checkpoint, indent=2))
+
+
+if __name__ == "__main__":
+    main()
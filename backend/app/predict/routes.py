@@ -1,16 +1,18 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.db.models import Prediction, User, Action, Clip
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_engine
 from app.auth.jwt_utils import get_current_user
 
-from app.models.predictor import predict
-
-import os
-import tempfile
+from app.models.config import BACKBONE_VERSIONS
+from app.predict.features import load_clip_features, prediction_values, save_clip_features
+from app.predict.jobs import jobs, JobQueueFull
+from app.storage.clip_store import clip_source
 
 router = APIRouter()
 
@@ -25,55 +27,57 @@ class SinglePrediction(BaseModel):
     severity: dict
     foul_model_results: List[dict]
     severity_model_results: List[dict]
+    metadata: Optional[dict] = None
 
 class PredictResponse(BaseModel):
     results: List[SinglePrediction]
 
 
-@router.post("/predict/{action_id}", response_model=PredictResponse)
-async def predict_endpoint(action_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    # Verify the action exists and belongs to the current user
-    action = db.query(Action).filter(Action.id == action_id, Action.user_id == current_user.id).first()
-    if not action:
-        raise HTTPException(status_code=404, detail="Action not found or you do not have permission to access it.")
+class PredictJobResponse(BaseModel):
+    job_id: str
+    action_id: int
+    status: str
+    result: Optional[PredictResponse] = None
+    error: Optional[str] = None
 
-    # Obtains the clips associated with the action
-    clips = db.query(Clip).filter(Clip.action_id == action.id).all()
-    if not clips:
-        raise HTTPException(status_code=404, detail="No clips found for this action.")
-    
-    # Delete the previous prediction if it exists
-    existing_prediction = db.query(Prediction).filter(Prediction.action_id == action.id).first()
-    if existing_prediction:
-        db.delete(existing_prediction)
-        db.commit()
 
-    # Creates temporary files for all clips
-    video_paths = []
+def predict(video_sources: list, known_features=None) -> dict:
+    # The prediction stack (torch, cv2, xgboost) is imported on first use
+    from app.models.predictor import predict as predict_action
+
+    return predict_action(video_sources, known_features)
+
+
+def run_prediction(action_id: int, bind) -> dict:
+    """Runs the prediction of an action and stores it. Executed by the job workers."""
+    db = Session(bind=bind)
+    video_sources = []
     try:
+        clips = db.query(Clip).filter(Clip.action_id == action_id).order_by(Clip.id).all()
+        clip_ids = [clip.id for clip in clips]
+
+        # Features stored for these clips skip decoding and backbone inference
+        stored_features = load_clip_features(db, clip_ids)
+
+        # Clips in a local store are opened in place, the rest are decoded from memory
         for clip in clips:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as temp_video:
-                temp_video.write(clip.content)
-                video_paths.append(temp_video.name)
-        
+            if len(stored_features[clip.id]) == len(BACKBONE_VERSIONS):
+                video_sources.append(None)
+                continue
+            video_sources.append(clip_source(clip))
+
         # Prediction call
-        prediction_results = predict(video_paths)
+        prediction_results = predict(video_sources, [stored_features[clip_id] for clip_id in clip_ids])
+
+        # Store the newly computed features next to the clips
+        save_clip_features(db, clip_ids, prediction_results["clip_features"], stored_features)
+
+        # Replace the previous prediction if it exists
+        db.query(Prediction).filter(Prediction.action_id == action_id).delete()
 
         # Save prediction to the database
-        prediction = Prediction(
-            action_id=action.id,
-            is_foul=prediction_results["is_foul"],
-            foul_confidence=prediction_results["foul_confidence"],
-            no_foul_confidence=prediction_results["no_foul_confidence"],
-            foul_model_results=prediction_results["foul_model_results"],  # Ensure this is serialized as JSON
-            no_card_confidence=prediction_results["severity"]["no_card"],
-            red_card_confidence=prediction_results["severity"]["red_card"],
-            yellow_card_confidence=prediction_results["severity"]["yellow_card"],
-            severity_model_results=prediction_results["severity_model_results"]  # Ensure this is serialized as JSON
-        )
-        db.add(prediction)
+        db.add(Prediction(**prediction_values(action_id, prediction_results)))
         db.commit()
-        db.refresh(prediction)
 
         results = [{
             "filename": f"clip_{clip.id}.mp4",
@@ -82,30 +86,59 @@ async def predict_endpoint(action_id: int, db: Session = Depends(get_db), curren
             "no_foul_confidence": prediction_results["no_foul_confidence"],
             "severity": prediction_results["severity"],
             "foul_model_results": prediction_results["foul_model_results"],
-            "severity_model_results": prediction_results["severity_model_results"]
+            "severity_model_results": prediction_results["severity_model_results"],
+            "metadata": prediction_results["metadata"]
         }]
+        return {"results": results}
 
     finally:
-        # Delete temporary files
-        for path in video_paths:
-            if os.path.exists(path):
-                os.remove(path)
+        db.close()
+
+@router.post("/predict/{action_id}", response_model=PredictJobResponse, status_code=202)
+async def predict_endpoint(
+    action_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    bind=Depends(get_engine),
+    current_user: User = Depends(get_current_user),
+):
+    # Verify the action exists and belongs to the current user
+    owned = await db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == current_user.id))
+    if not owned:
+        raise HTTPException(status_code=404, detail="Action not found or you do not have permission to access it.")
+
+    # Verify the action has clips to predict on
+    has_clips = await db.scalar(select(Clip.id).where(Clip.action_id == action_id).limit(1))
+    if not has_clips:
+        raise HTTPException(status_code=404, detail="No clips found for this action.")
+
+    # Enqueue the prediction, the worker is synchronous and opens its own session on the engine
+    try:
+        job = jobs.submit(run_prediction, action_id, bind, user_id=current_user.id, action_id=action_id)
+    except JobQueueFull:
+        raise HTTPException(status_code=429, detail="Too many predictions in progress. Try again later.")
+
+    return job.to_dict()
 
-    return {"results": results}
+@router.get("/predict/jobs/{job_id}", response_model=PredictJobResponse)
+async def get_prediction_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = jobs.get(job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Prediction job not found.")
+    return job.to_dict()
 
 @router.get("/predict/{action_id}", response_model=PredictResponse)
 async def get_prediction(
     action_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     # Verificar que la acción existe y pertenece al usuario
-    action = db.query(Action).filter(Action.id == action_id, Action.user_id == current_user.id).first()
-    if not action:
+    owned = await db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == current_user.id))
+    if not owned:
         raise HTTPException(status_code=404, detail="Action not found or access denied")
 
     # Obtener predicción única asociada a esta acción
-    prediction = db.query(Prediction).filter(Prediction.action_id == action_id).first()
+    prediction = await db.scalar(select(Prediction).where(Prediction.action_id == action_id).limit(1))
     if not prediction:
         raise HTTPException(status_code=404, detail="No prediction found for this action")
 
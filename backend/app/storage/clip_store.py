@@ -0,0 +1,250 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Iterator, Optional
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# Backend used to store the clip videos
+CLIP_STORE_BACKEND = os.getenv("CLIP_STORE_BACKEND", "local")
+# Directory where the local backend stores the clip videos
+CLIP_STORAGE_DIR = os.getenv(
+    "CLIP_STORAGE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "storage", "clips"),
+)
+# Largest clip accepted by the upload, in bytes
+CLIP_MAX_BYTES = int(os.getenv("CLIP_MAX_BYTES", 200 * 1024 * 1024))
+# Bytes read from the upload and written to the store at a time
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class ClipTooLarge(Exception):
+    pass
+
+
+class StoredClip:
+    def __init__(self, key: str, size: int, sha256: str):
+        self.key = key
+        self.size = size
+        self.sha256 = sha256
+
+
+class ClipStore(ABC):
+    """
+    Interface of the clip video stores. The database only keeps the key, size
+    and hash of each clip, the bytes live in the store.
+    """
+
+    @abstractmethod
+    async def save_upload(self, file: UploadFile, max_bytes: int = CLIP_MAX_BYTES) -> StoredClip:
+        """Streams an upload into the store. Raises ClipTooLarge past `max_bytes`."""
+
+    @abstractmethod
+    def save_bytes(self, content: bytes) -> StoredClip:
+        pass
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        pass
+
+    def read(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def local_path(self, key: str) -> Optional[str]:
+        """Path of the clip on the local filesystem, None if the backend has no such path."""
+        return None
+
+    @abstractmethod
+    def delete(self, key: str, written_before: Optional[float] = None) -> bool:
+        """
+        Deletes a clip. With `written_before`, a timestamp, keeps the clip if it
+        was written again since then, e.g. by an upload of the same video that
+        has not committed its clip rows yet. Returns whether it was deleted.
+        """
+
+    @abstractmethod
+    def list_clips(self) -> Iterator[tuple[str, float]]:
+        """Keys of the stored clips, with the time each was last written."""
+
+    def sweep_tmp(self, written_before: float) -> int:
+        """
+        Removes the temporary files last written before `written_before`, left
+        by interrupted uploads. Returns how many; backends without any keep 0.
+        """
+        return 0
+
+
+class LocalClipStore(ClipStore):
+    """
+    Stores clip videos on the local filesystem, content-addressed: the key
+    of a clip is the SHA-256 of its bytes, so identical uploads share a file.
+    """
+
+    def __init__(self, root: str = CLIP_STORAGE_DIR):
+        self.root = root
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def local_path(self, key: str) -> Optional[str]:
+        return self.path(key)
+
+    async def save_upload(self, file: UploadFile, max_bytes: int = CLIP_MAX_BYTES) -> StoredClip:
+        # Memory stays bounded by the chunk size whatever the size of the clip.
+        # The file operations run in the threadpool so they never block the event loop
+        writer = self._writer()
+        await run_in_threadpool(writer.__enter__)
+        try:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                if writer.size + len(chunk) > max_bytes:
+                    raise ClipTooLarge(f"Clip {file.filename} is larger than {max_bytes} bytes")
+                await run_in_threadpool(writer.write, chunk)
+        except BaseException as e:
+            await run_in_threadpool(writer.__exit__, type(e), e, e.__traceback__)
+            raise
+        await run_in_threadpool(writer.__exit__, None, None, None)
+        return writer.stored
+
+    def save_bytes(self, content: bytes) -> StoredClip:
+        with self._writer() as writer:
+            writer.write(content)
+        return writer.stored
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.path(key), "rb")
+
+    def delete(self, key: str, written_before: Optional[float] = None) -> bool:
+        path = self.path(key)
+        if written_before is None:
+            try:
+                os.remove(path)
+                return True
+            except FileNotFoundError:
+                return False
+
+        # Moved aside first, so a writer refreshing the file either does it
+        # before the check below or finds it gone and stores its own copy
+        trash_path = os.path.join(self.root, "tmp", f"{key}.{uuid.uuid4().hex}.deleted")
+        os.makedirs(os.path.dirname(trash_path), exist_ok=True)
+        try:
+            os.replace(path, trash_path)
+        except FileNotFoundError:
+            return False
+        if os.stat(trash_path).st_mtime >= written_before:
+            # Written again meanwhile; any copy stored since has the same bytes
+            os.replace(trash_path, path)
+            return False
+        os.remove(trash_path)
+        return True
+
+    def list_clips(self) -> Iterator[tuple[str, float]]:
+        # Clips live in root/<2 hex>/<2 hex>/<key>, the tmp directory is skipped
+        for top in _scan_dirs(self.root):
+            for sub in _scan_dirs(top.path):
+                for entry in os.scandir(sub.path):
+                    if entry.is_file():
+                        yield entry.name, entry.stat().st_mtime
+
+    def sweep_tmp(self, written_before: float) -> int:
+        removed = 0
+        try:
+            entries = list(os.scandir(os.path.join(self.root, "tmp")))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            written_at = stat.st_mtime
+            if entry.name.endswith(".deleted"):
+                # Clips a running delete just moved aside keep their old mtime,
+                # only the ctime tells when they were moved
+                written_at = max(written_at, stat.st_ctime)
+            if written_at < written_before:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def _writer(self) -> "_LocalClipWriter":
+        return _LocalClipWriter(self)
+
+
+class _LocalClipWriter:
+    """Writes a clip to a temporary file and moves it to its content address on success."""
+
+    def __init__(self, store: LocalClipStore):
+        self.store = store
+        self.size = 0
+        self.stored: Optional[StoredClip] = None
+        self._digest = hashlib.sha256()
+
+    def __enter__(self) -> "_LocalClipWriter":
+        tmp_dir = os.path.join(self.store.root, "tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        self._file = os.fdopen(fd, "wb")
+        return self
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        self._digest.update(chunk)
+        self._file.write(chunk)
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        if exc_type is not None:
+            os.remove(self._tmp_path)
+            return
+
+        key = self._digest.hexdigest()
+        path = self.store.path(key)
+        try:
+            # Same content already stored: marks it as written now, so the
+            # sweep keeps it until the clip rows of this upload are committed
+            os.utime(path)
+            os.remove(self._tmp_path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._tmp_path, path)
+        self.stored = StoredClip(key=key, size=self.size, sha256=key)
+
+
+def _scan_dirs(path: str) -> list[os.DirEntry]:
+    try:
+        return [entry for entry in os.scandir(path) if entry.is_dir() and len(entry.name) == 2]
+    except FileNotFoundError:
+        return []
+
+
+CLIP_STORE_BACKENDS = {
+    "local": LocalClipStore,
+}
+
+
+def create_clip_store(backend: str = CLIP_STORE_BACKEND) -> ClipStore:
+    if backend not in CLIP_STORE_BACKENDS:
+        raise ValueError(f"Unknown clip store backend: {backend}")
+    return CLIP_STORE_BACKENDS[backend]()
+
+
+clip_store = create_clip_store()
+
+
+def read_clip_content(clip) -> Optional[bytes]:
+    """Bytes of a clip, from the clip store or from the legacy content column."""
+    if clip.storage_key:
+        return clip_store.read(clip.storage_key)
+    return clip.content
+
+
+def clip_source(clip):
+    """Local path of a clip when its store has one, its bytes otherwise."""
+    local_path = clip_store.local_path(clip.storage_key) if clip.storage_key else None
+    return local_path or read_clip_content(clip)
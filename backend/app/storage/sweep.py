@@ -0,0 +1,98 @@
+"""
+Deletes the clip videos no clip row points to anymore:
+    python -m app.storage.sweep [--grace-seconds 3600]
+
+Identical clips share a stored video, so a video is only known to be
+unused once the rows pointing to it are committed. Videos written within
+the grace period are kept, so an upload that stored or reused a video but
+has not committed its clip rows yet never loses it. The temporary files
+left by interrupted uploads are removed after the same grace period. The
+API also sweeps the store every CLIP_SWEEP_INTERVAL seconds.
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.db.models import Clip
+from app.storage.clip_store import ClipStore, clip_store
+
+logger = logging.getLogger(__name__)
+
+# Seconds an unreferenced video is kept; longer than an upload takes to commit
+CLIP_SWEEP_GRACE_SECONDS = int(os.getenv("CLIP_SWEEP_GRACE_SECONDS", 3600))
+# Seconds between two sweeps of the API, 0 disables them
+CLIP_SWEEP_INTERVAL = int(os.getenv("CLIP_SWEEP_INTERVAL", 3600))
+# Keys checked against the clip table per query
+SWEEP_BATCH_SIZE = 500
+
+
+def sweep_clips(db: Session, store: ClipStore = clip_store, grace_seconds: int = CLIP_SWEEP_GRACE_SECONDS) -> int:
+    """Deletes the stored videos older than the grace period that no clip row points to. Returns how many."""
+    written_before = time.time() - grace_seconds
+    removed = store.sweep_tmp(written_before)
+    if removed:
+        logger.info("Clip sweep removed %d temporary files of interrupted uploads", removed)
+    candidates = [key for key, written_at in store.list_clips() if written_at < written_before]
+
+    deleted = 0
+    for first in range(0, len(candidates), SWEEP_BATCH_SIZE):
+        keys = candidates[first:first + SWEEP_BATCH_SIZE]
+        referenced = set(db.scalars(select(Clip.storage_key).where(Clip.storage_key.in_(keys))))
+        # Ends the read, so the next batch sees the clips committed meanwhile
+        db.rollback()
+        for key in keys:
+            if key not in referenced:
+                deleted += store.delete(key, written_before=written_before)
+    return deleted
+
+
+class ClipSweeper:
+    """Sweeps the clip store every `interval` seconds on a background thread."""
+
+    def __init__(self, session_factory, interval: int = CLIP_SWEEP_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self.interval <= 0:
+            return
+        self._thread = threading.Thread(target=self._loop, name="clip-sweep", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                with self.session_factory() as db:
+                    deleted = sweep_clips(db)
+                logger.info("Clip sweep deleted %d unreferenced videos", deleted)
+            except Exception:
+                logger.exception("Clip sweep failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grace-seconds", type=int, default=CLIP_SWEEP_GRACE_SECONDS, help="age below which videos are kept")
+    args = parser.parse_args()
+
+    from app.db.database import SessionLocal
+
+    with SessionLocal() as db:
+        deleted = sweep_clips(db, grace_seconds=args.grace_seconds)
+    print(f"Deleted {deleted} unreferenced clip videos.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Load test of the login route: fires concurrent logins at the app in process
+and reports their p50/p99 latency. A probe polls a cheap route meanwhile;
+its latency shows whether bcrypt stalls the other requests of the worker.
+Compares bcrypt on the password hashing pool with bcrypt run inline on
+the event loop, as register did before.
+
+Usage (from backend/):
+    python -m benchmarks.login [--concurrency 1 8 32] [--requests N] [--rounds N]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+PROBE_INTERVAL = 0.01
+PASSWORD = "LoadTest123"
+
+
+async def probe(client, latencies: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health/passwords")
+        latencies.append(time.perf_counter() - start)
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def login_burst(client, concurrency: int, num_requests: int) -> tuple[list, int]:
+    """Runs `num_requests` logins, `concurrency` at a time. Returns their latencies and the rejected count."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    rejected = 0
+
+    async def login():
+        nonlocal rejected
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.post("/login", data={"username": "load@example.com", "password": PASSWORD})
+            latencies.append(time.perf_counter() - start)
+            rejected += response.status_code == 429
+
+    await asyncio.gather(*(login() for _ in range(num_requests)))
+    return latencies, rejected
+
+
+async def run(args) -> None:
+    from httpx import ASGITransport, AsyncClient
+
+    from app.auth.passwords import password_hasher
+    from app.db.database import async_engine, engine
+    from app.db.models import Base
+    from main import app
+
+    Base.metadata.create_all(engine)
+    pool_run = password_hasher._run
+
+    async def inline_run(fn, *fn_args):
+        return fn(*fn_args)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.post("/register", json={"email": "load@example.com", "password": PASSWORD, "confirm_password": PASSWORD})
+
+        print(f"{'bcrypt':<12}{'concurrency':>12}{'login p50 (ms)':>16}{'login p99 (ms)':>16}{'probe p99 (ms)':>16}{'probe max (ms)':>16}{'429s':>6}")
+        for mode, hasher_run in (("pool", pool_run), ("event loop", inline_run)):
+            password_hasher._run = hasher_run
+            for concurrency in args.concurrency:
+                probe_latencies = []
+                stop = asyncio.Event()
+                probe_task = asyncio.create_task(probe(client, probe_latencies, stop))
+                latencies, rejected = await login_burst(client, concurrency, args.requests)
+                stop.set()
+                await probe_task
+                print(
+                    f"{mode:<12}{concurrency:>12}"
+                    f"{np.percentile(latencies, 50) * 1000:>16.1f}{np.percentile(latencies, 99) * 1000:>16.1f}"
+                    f"{np.percentile(probe_latencies, 99) * 1000:>16.1f}{max(probe_latencies) * 1000:>16.1f}{rejected:>6}"
+                )
+        password_hasher._run = pool_run
+    # Closes the pooled aiosqlite connections, whose threads would keep the process alive
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="logins per concurrency level")
+    parser.add_argument("--rounds", type=int, help="bcrypt cost, BCRYPT_ROUNDS by default")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # A throwaway database; the app reads its settings on import
+        os.environ["DB_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'login.db')}"
+        os.environ.pop("ASYNC_DB_URL", None)
+        os.environ["ENV"] = "test"
+        if args.rounds:
+            os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Compares the forward MViT frame sampler with the previous per-frame seek
+sampler: checks both return the same frames and times them.
+
+Usage (from backend/):
+    python -m benchmarks.mvit_sampler [videos ...] [--repeat N]
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.models.frames import sample_frames, sample_indices
+
+DEFAULT_VIDEOS = ["tests/assets/videos/clip_0.mp4", "tests/assets/videos/clip_1.mp4"]
+
+
+def seek_sample_frames(video_path, start_frame=60, end_frame=80, num_frames=16):
+    """Previous sampler: seeks to each index, forcing a keyframe seek and re-decode per frame."""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Error al abrir el video: {video_path}")
+
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if total_frames == 0:
+        raise ValueError("El video no contiene frames")
+
+    frames = []
+    for i in sample_indices(total_frames, start_frame, end_frame, num_frames):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+
+    cap.release()
+    return frames
+
+
+def best_time(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="*", default=DEFAULT_VIDEOS)
+    parser.add_argument("--start-frame", type=int, default=50)
+    parser.add_argument("--end-frame", type=int, default=80)
+    parser.add_argument("--num-frames", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sampling = (args.start_frame, args.end_frame, args.num_frames)
+    print(f"{'video':<40} {'seek (ms)':>10} {'forward (ms)':>13} {'speedup':>8}  identical")
+    for video in args.videos:
+        reference = seek_sample_frames(video, *sampling)
+        frames = sample_frames(video, *sampling)
+        identical = len(reference) == len(frames) and all(np.array_equal(a, b) for a, b in zip(reference, frames))
+
+        seek_time = best_time(lambda: seek_sample_frames(video, *sampling), args.repeat)
+        forward_time = best_time(lambda: sample_frames(video, *sampling), args.repeat)
+        print(
+            f"{video:<40} {seek_time * 1000:>10.1f} {forward_time * 1000:>13.1f} "
+            f"{seek_time / forward_time:>7.2f}x  {identical}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Compares the batched tensor preprocessing of the backbone inputs with the
+previous per-frame PIL transforms and list/np.array/torch.tensor copies.
+Reports time, the number and size of large tensor allocations and the
+numpy peak memory of each variant.
+
+Usage (from backend/):
+    python -m benchmarks.preprocessing [videos ...] [--repeat N]
+"""
+import argparse
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from torch.profiler import ProfilerActivity, profile
+
+from app.models.frames import decode_clip
+from app.models.predictor import (
+    MVIT_END_FRAME,
+    MVIT_FRAME_SIZE,
+    MVIT_START_FRAME,
+    preprocess_video_for_mvit,
+    preprocess_video_for_slowfast,
+    preprocess_video_for_x3d,
+)
+from app.models.preprocessing import KINETICS_MEAN, KINETICS_STD, batch_to_tensor
+
+DEFAULT_VIDEOS = ["tests/assets/videos/clip_0.mp4", "tests/assets/videos/clip_1.mp4"]
+# Allocations smaller than this (scalars, shapes) are not counted
+LARGE_ALLOCATION_BYTES = 64 * 1024
+
+transform = transforms.Compose([
+    transforms.Resize(MVIT_FRAME_SIZE),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=KINETICS_MEAN, std=KINETICS_STD),
+])
+
+
+def previous_mvit(clips):
+    batch = []
+    for clip in clips:
+        frames = [transform(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))) for frame in clip.samples]
+        frames += [frames[-1]] * (16 - len(frames))
+        batch.append(torch.stack(frames).permute(1, 0, 2, 3).unsqueeze(0))
+    return torch.cat(batch)
+
+
+def previous_x3d(clips):
+    frames = np.stack([preprocess_video_for_x3d(clip) for clip in clips])
+    return (torch.tensor(frames).float() / 255.0).permute(0, 2, 1, 3, 4)
+
+
+def previous_slowfast(clips):
+    inputs = [preprocess_video_for_slowfast(clip) for clip in clips]
+    slow = torch.tensor(np.stack([s for s, _ in inputs])).float() / 255.0
+    fast = torch.tensor(np.stack([f for _, f in inputs])).float() / 255.0
+    return [slow.permute(0, 2, 1, 3, 4), fast.permute(0, 2, 1, 3, 4)]
+
+
+def batched_mvit(clips):
+    return batch_to_tensor(
+        "mvit", [preprocess_video_for_mvit(clip) for clip in clips],
+        size=MVIT_FRAME_SIZE, rgb=True, mean=KINETICS_MEAN, std=KINETICS_STD,
+    )
+
+
+def batched_x3d(clips):
+    return batch_to_tensor("x3d", [preprocess_video_for_x3d(clip) for clip in clips])
+
+
+def batched_slowfast(clips):
+    inputs = [preprocess_video_for_slowfast(clip) for clip in clips]
+    return [
+        batch_to_tensor("slowfast_slow", [s for s, _ in inputs]),
+        batch_to_tensor("slowfast_fast", [f for _, f in inputs]),
+    ]
+
+
+VARIANTS = {
+    "mvit": (previous_mvit, batched_mvit),
+    "x3d": (previous_x3d, batched_x3d),
+    "slowfast": (previous_slowfast, batched_slowfast),
+}
+
+
+def measure(fn, clips, repeat: int) -> dict:
+    fn(clips)  # Warm up, so reusable buffers already exist
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(clips)
+        times.append(time.perf_counter() - start)
+
+    with profile(activities=[ProfilerActivity.CPU], profile_memory=True) as prof:
+        fn(clips)
+    allocations = [
+        event.self_cpu_memory_usage for event in prof.events()
+        if event.self_cpu_memory_usage >= LARGE_ALLOCATION_BYTES
+    ]
+
+    tracemalloc.start()
+    fn(clips)
+    _, numpy_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "time": min(times),
+        "allocations": len(allocations),
+        "allocated": sum(allocations),
+        "numpy_peak": numpy_peak,
+    }
+
+
+def max_difference(a, b) -> float:
+    if isinstance(a, list):
+        return max(max_difference(x, y) for x, y in zip(a, b))
+    return (a - b).abs().max().item()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="*", default=DEFAULT_VIDEOS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    clips = [decode_clip(video, start_frame=MVIT_START_FRAME, end_frame=MVIT_END_FRAME) for video in args.videos]
+    print(f"Batch of {len(clips)} clips")
+    print(f"{'backbone':<9} {'variant':<9} {'time (ms)':>10} {'allocs':>7} {'allocated (MB)':>15} {'numpy peak (MB)':>16}")
+    for name, (previous, batched) in VARIANTS.items():
+        for variant, fn in (("previous", previous), ("batched", batched)):
+            result = measure(fn, clips, args.repeat)
+            print(
+                f"{name:<9} {variant:<9} {result['time'] * 1000:>10.1f} {result['allocations']:>7} "
+                f"{result['allocated'] / 2**20:>15.1f} {result['numpy_peak'] / 2**20:>16.1f}"
+            )
+        print(f"{name:<9} max abs difference: {max_difference(previous(clips), batched(clips)):.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Times the database queries of the action and prediction routes on a seeded
+database: 100k actions by default, spread over users with a few actions
+each, with their clips and predictions. Reports the p50/p99 latency of
+each route's queries, with the indexes of the models or without them.
+The upload, which writes, is timed by benchmarks/upload.py.
+
+Usage (from backend/):
+    python -m benchmarks.queries [--actions N] [--queries N] [--without-indexes] [--db-url URL]
+
+The default database is a temporary SQLite file. A --db-url database must
+be empty, its tables are created and dropped by the benchmark.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import create_engine, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.db.models import Action, Base, Clip, Prediction, User
+
+ACTIONS_PER_USER = 4
+CLIPS_PER_ACTION = 2
+# Indexes added for these routes, dropped with --without-indexes
+ROUTE_INDEXES = ["ix_action_user_id_created_at", "ix_clip_action_id", "ix_prediction_action_id"]
+SEED_BATCH = 10_000
+
+
+def seed(engine, num_actions: int) -> int:
+    """Inserts the users, actions, clips and predictions. Returns the number of users."""
+    num_users = max(1, num_actions // ACTIONS_PER_USER)
+    created_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i + 1, "email": f"user{i}@example.com", "password": "x"} for i in range(num_users)
+        ])
+        for first in range(0, num_actions, SEED_BATCH):
+            ids = range(first + 1, min(first + SEED_BATCH, num_actions) + 1)
+            conn.execute(insert(Action), [
+                {"id": i, "user_id": (i - 1) % num_users + 1, "created_at": created_at + timedelta(seconds=i)}
+                for i in ids
+            ])
+            conn.execute(insert(Clip), [
+                {"action_id": i, "storage_key": f"{i:08d}{j}", "size_bytes": 1024, "sha256": f"{i:08d}{j}"}
+                for i in ids for j in range(CLIPS_PER_ACTION)
+            ])
+            conn.execute(insert(Prediction), [
+                {
+                    "action_id": i, "is_foul": True, "foul_confidence": 100, "no_foul_confidence": 0,
+                    "foul_model_results": [], "no_card_confidence": 100, "red_card_confidence": 0,
+                    "yellow_card_confidence": 0, "severity_model_results": [],
+                }
+                for i in ids
+            ])
+    return num_users
+
+
+# The statements run by each route, as in app/action/routes.py and
+# app/predict/routes.py, on a synchronous session
+def get_last_action(db: Session, user_id: int, action_id: int):
+    from app.action.routes import CLIP_METADATA_COLUMNS
+
+    action_id = db.scalar(
+        select(Action.id).where(Action.user_id == user_id).order_by(Action.created_at.desc()).limit(1)
+    )
+    return db.execute(select(*CLIP_METADATA_COLUMNS).where(Clip.action_id == action_id).order_by(Clip.id)).all()
+
+
+def get_action_clips(db: Session, user_id: int, action_id: int):
+    from app.action.routes import CLIP_METADATA_COLUMNS
+
+    db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == user_id))
+    return db.execute(select(*CLIP_METADATA_COLUMNS).where(Clip.action_id == action_id).order_by(Clip.id)).all()
+
+
+def post_predict(db: Session, user_id: int, action_id: int):
+    db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == user_id))
+    return db.scalar(select(Clip.id).where(Clip.action_id == action_id).limit(1))
+
+
+def get_prediction(db: Session, user_id: int, action_id: int):
+    db.scalar(select(Action.id).where(Action.id == action_id, Action.user_id == user_id))
+    return db.scalar(select(Prediction).where(Prediction.action_id == action_id).limit(1))
+
+
+ROUTES = {
+    "GET /action/last": get_last_action,
+    "GET /action/{id}": get_action_clips,
+    "POST /predict/{id}": post_predict,
+    "GET /predict/{id}": get_prediction,
+}
+
+
+def run(engine, num_users: int, num_queries: int) -> dict:
+    rng = random.Random(0)
+    results = {}
+    for name, route in ROUTES.items():
+        timings = []
+        for _ in range(num_queries):
+            user_id = rng.randint(1, num_users)
+            # The most recent action of the user
+            action_id = user_id + (ACTIONS_PER_USER - 1) * num_users
+            with Session(engine) as db:
+                start = time.perf_counter()
+                route(db, user_id, action_id)
+                timings.append(time.perf_counter() - start)
+        results[name] = (np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500, help="timed queries per route")
+    parser.add_argument("--without-indexes", action="store_true", help="drop the route indexes before timing")
+    parser.add_argument("--db-url")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_url = args.db_url
+    if not db_url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'queries.db')}"
+    # The routes open the configured database on import
+    os.environ.setdefault("DB_URL", db_url)
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    try:
+        start = time.perf_counter()
+        num_users = seed(engine, args.actions)
+        print(f"Seeded {args.actions} actions of {num_users} users in {time.perf_counter() - start:.1f}s")
+        if args.without_indexes:
+            with engine.begin() as conn:
+                for index in ROUTE_INDEXES:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {index}"))
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        print(f"{'route':<24}{'p50 (ms)':>10}{'p99 (ms)':>10}")
+        for name, (p50, p99) in run(engine, num_users, args.queries).items():
+            print(f"{name:<24}{p50:>10.3f}{p99:>10.3f}")
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Compares the set-based action replacement of the upload with the previous
+per-action delete loop, for users with a growing number of previous
+actions. Reports the p50 latency of the database work of an upload and the
+number of statements it sends.
+
+Usage (from backend/):
+    python -m benchmarks.upload [--history 0 10 100 1000] [--repeat N] [--db-url URL]
+
+The default database is a temporary SQLite file. A --db-url database must
+be empty, its tables are created and dropped by the benchmark.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+
+from app.db.models import Action, Base, Clip, ClipFeature, Prediction, User
+from app.storage.clip_store import StoredClip
+
+CLIPS_PER_ACTION = 3
+
+
+def previous_replace_action(db: Session, user_id: int, stored_clips: list, durations: list) -> tuple[int, set[str]]:
+    """Previous upload: deletes per action across several commits, then adds the clips one by one."""
+    previous_actions = db.query(Action).filter(Action.user_id == user_id).all()
+    previous_keys = []
+    for action in previous_actions:
+        clip_keys = db.query(Clip.storage_key).filter(Clip.action_id == action.id, Clip.storage_key.isnot(None)).all()
+        previous_keys += [key for (key,) in clip_keys]
+        db.query(Prediction).filter(Prediction.action_id == action.id).delete()
+        db.query(Clip).filter(Clip.action_id == action.id).delete()
+    db.query(Action).filter(Action.user_id == user_id).delete()
+    db.commit()
+
+    action = Action(user_id=user_id)
+    db.add(action)
+    db.commit()
+    db.refresh(action)
+
+    for stored, duration in zip(stored_clips, durations):
+        db.add(Clip(
+            action_id=action.id, storage_key=stored.key, size_bytes=stored.size,
+            sha256=stored.sha256, duration_seconds=duration,
+        ))
+    db.commit()
+    return action.id, set(previous_keys)
+
+
+def seed_history(engine, user_id: int, num_actions: int) -> None:
+    """Gives the user `num_actions` actions, each with its clips, features and prediction."""
+    if not num_actions:
+        return
+    with engine.begin() as conn:
+        action_ids = conn.execute(
+            insert(Action).returning(Action.id), [{"user_id": user_id}] * num_actions
+        ).scalars().all()
+        clip_ids = conn.execute(insert(Clip).returning(Clip.id), [
+            {"action_id": action_id, "storage_key": f"{action_id}-{i}", "size_bytes": 1024, "sha256": f"{action_id}-{i}"}
+            for action_id in action_ids for i in range(CLIPS_PER_ACTION)
+        ]).scalars().all()
+        conn.execute(insert(ClipFeature), [
+            {"clip_id": clip_id, "backbone": "x3d", "model_version": "x3d_s.1", "dim": 1, "vector": b"\0" * 4}
+            for clip_id in clip_ids
+        ])
+        conn.execute(insert(Prediction), [
+            {
+                "action_id": action_id, "is_foul": True, "foul_confidence": 100, "no_foul_confidence": 0,
+                "foul_model_results": [], "no_card_confidence": 100, "red_card_confidence": 0,
+                "yellow_card_confidence": 0, "severity_model_results": [],
+            }
+            for action_id in action_ids
+        ])
+
+
+def time_replace(engine, replace, history: int, repeat: int) -> tuple[float, int]:
+    """p50 seconds and statements of `replace` for a user with `history` previous actions."""
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(User).returning(User.id), {"email": f"{replace.__name__}-{history}", "password": "x"}).scalar_one()
+    stored = [StoredClip(key=f"new-{i}", size=1024, sha256=f"new-{i}") for i in range(CLIPS_PER_ACTION)]
+
+    statements = []
+    count = lambda *args: statements.append(1)
+    times = []
+    for _ in range(repeat):
+        seed_history(engine, user_id, history)
+        statements.clear()
+        event.listen(engine, "before_cursor_execute", count)
+        with Session(engine) as db:
+            start = time.perf_counter()
+            replace(db, user_id, stored, [10.0] * len(stored))
+            times.append(time.perf_counter() - start)
+        event.remove(engine, "before_cursor_execute", count)
+    return float(np.percentile(times, 50)), len(statements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[0, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--db-url")
+    args = parser.parse_args()
+
+    tmp_dir = None
+    db_url = args.db_url
+    if not db_url:
+        tmp_dir = tempfile.TemporaryDirectory()
+        db_url = f"sqlite:///{os.path.join(tmp_dir.name, 'upload.db')}"
+    # The routes open the configured database on import
+    os.environ.setdefault("DB_URL", db_url)
+    from app.action.routes import replace_action
+
+    engine = create_engine(db_url)
+    if engine.dialect.name == "sqlite":
+        # Cascade the clip features like PostgreSQL does, the previous upload relied on it
+        event.listen(engine, "connect", lambda conn, record: conn.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    try:
+        print(f"{'previous actions':>16}{'loop (ms)':>12}{'stmts':>8}{'set-based (ms)':>16}{'stmts':>8}")
+        for history in args.history:
+            loop_time, loop_statements = time_replace(engine, previous_replace_action, history, args.repeat)
+            set_time, set_statements = time_replace(engine, replace_action, history, args.repeat)
+            print(f"{history:>16}{loop_time * 1000:>12.2f}{loop_statements:>8}{set_time * 1000:>16.2f}{set_statements:>8}")
+    finally:
+        Base.metadata.drop_all(engine)
+        engine.dispose()
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,11 @@ import os
 from app.auth.routes import router as auth_router
 from app.action.routes import router as action_router
 from app.predict.routes import router as predict_router
+from app.health.routes import router as health_router
 from fastapi.middleware.cors import CORSMiddleware
-from app.models.predictor import load_models
-import os
-
-# Models
-FOUL_MODELS = None
-SEVERITY_MODELS = None
+from app.models import runtime
+from app.db.database import SessionLocal
+from app.storage.sweep import ClipSweeper
 
 def print_ascii_art():
     logo = r"""
@@ -32,21 +30,24 @@ def lifespan(app: FastAPI):
     
     print_ascii_art()
     
-    global FOUL_MODELS, SEVERITY_MODELS
+    # STARTUP: load the ensembles and backbones once, so requests never load them
+    profile = runtime.warm_up()
+    for module, seconds in profile["imports"].items():
+        print(f"Imported {module} in {seconds:.2f}s.")
+    for name, seconds in profile["loads"].items():
+        print(f"Model {name} loaded in {seconds:.2f}s.")
+    print(f"Models loaded successfully ({profile['total_import_seconds']:.2f}s importing, "
+          f"{profile['total_load_seconds']:.2f}s loading).")
 
-    # STARTUP
-    FOUL_MODELS = load_models(os.path.join(os.path.dirname(__file__), "app/models/foul"))
-    if len(FOUL_MODELS) != 3:
-        raise RuntimeError("3 foul models were expected.")
-    SEVERITY_MODELS = load_models(os.path.join(os.path.dirname(__file__), "app/models/severity"))
-    if len(SEVERITY_MODELS) != 3:
-        raise RuntimeError("3 severity models were expected.")
-    print("Models loaded successfully.")
+    # Deletes the clip videos left unreferenced by new uploads
+    sweeper = ClipSweeper(SessionLocal)
+    sweeper.start()
 
     yield  # This will be executed when the app is running
 
     # SHUTDOWN
     print("Shutting down...")
+    sweeper.stop()
 
 app = FastAPI(title="Referai API", lifespan=lifespan)
 
@@ -61,4 +62,5 @@ app.add_middleware(
 
 app.include_router(auth_router)
 app.include_router(action_router)
-app.include_router(predict_router)
\ No newline at end of file
+app.include_router(predict_router)
+app.include_router(health_router)
\ No newline at end of file
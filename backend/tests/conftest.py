@@ -2,23 +2,34 @@ import pytest
 from httpx import AsyncClient
 from httpx import ASGITransport
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from sqlalchemy_utils import create_database, database_exists, drop_database
 import pytest_asyncio 
 
-from app.db.database import get_db
+from app.db.database import get_async_db, get_db, get_engine
 from app.db.models import Base
 
 import os
+import tempfile
 os.environ["ENV"] = "test"
+os.environ.setdefault("CLIP_STORAGE_DIR", tempfile.mkdtemp(prefix="referai-clips-"))
+# Cheap hashes; the tests check behaviour, not the bcrypt cost
+os.environ.setdefault("BCRYPT_ROUNDS", "5")
 
 from main import app
 
 TEST_DATABASE_URL = "sqlite:///./tests/test.db"
+TEST_ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./tests/test.db"
 
 engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Each test runs its own event loop, connections are not pooled across them
+async_engine = create_async_engine(TEST_ASYNC_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Create the database and tables
 @pytest.fixture(scope="session", autouse=True)
 def setup_database():
@@ -47,7 +58,13 @@ async def client(db):
         finally:
             db.close()
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as session:
+            yield session
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_engine] = lambda: engine
 
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
@@ -0,0 +1,14 @@
+import numpy as np
+
+class FakeClassifier:
+    """Classifier of an ensemble that predicts the same probabilities for any features."""
+
+    def __init__(self, backbone, probabilities):
+        self.backbone = backbone
+        self.classes = np.arange(len(probabilities))
+        self.probabilities = np.array([probabilities])
+        self.calls = 0
+
+    def predict_proba(self, features):
+        self.calls += 1
+        return self.probabilities
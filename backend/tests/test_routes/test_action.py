@@ -1,6 +1,11 @@
 import pytest
-import base64
 import uuid
+from sqlalchemy import event, inspect
+
+import app.action.routes as action_routes
+from app.auth.jwt_utils import create_clip_token
+from app.db.models import Action, Clip, ClipFeature, Prediction, User
+from app.storage.clip_store import StoredClip
 
 def create_fake_clip_bytes(i: int):
     return f"clip-content-{i}".encode("utf-8")
@@ -41,8 +46,13 @@ async def test_upload_and_retrieve_action(client):
     assert last_resp.json()["action_id"] == action_id
     assert len(last_resp.json()["clips"]) == 3
     for clip in last_resp.json()["clips"]:
-        decoded = base64.b64decode(clip["content"])
-        assert decoded.startswith(b"clip-content-")
+        assert "content" not in clip
+        assert clip["size_bytes"] == len(create_fake_clip_bytes(1))
+        # Not a readable video
+        assert clip["duration_seconds"] is None
+        video_resp = await client.get(clip["url"])
+        assert video_resp.status_code == 200
+        assert video_resp.content.startswith(b"clip-content-")
 
     # 4. Gets the action by ID
     get_resp = await client.get(f"/action/{action_id}", headers=headers)
@@ -115,4 +125,193 @@ async def test_get_last_action_empty(client):
 
     resp = await client.get("/action/last", headers=headers)
     assert resp.status_code == 404
-    assert resp.json()["detail"] == "No actions found for this user."
\ No newline at end of file
+    assert resp.json()["detail"] == "No actions found for this user."
+
+@pytest.mark.asyncio
+async def test_upload_clip_too_large_keeps_previous_action(client, monkeypatch):
+    email = f"toolarge_{uuid.uuid4().hex[:6]}@example.com"
+    password = "TestPass123"
+    await client.post("/register", json={
+        "email": email,
+        "password": password,
+        "confirm_password": password
+    })
+    login_resp = await client.post(
+        "/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    token = login_resp.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    files = [
+        ("files", ("clip1.mp4", create_fake_clip_bytes(1), "video/mp4")),
+        ("files", ("clip2.mp4", create_fake_clip_bytes(2), "video/mp4")),
+    ]
+    upload_resp = await client.post("/upload", headers=headers, files=files)
+    assert upload_resp.status_code == 200
+    action_id = upload_resp.json()["action_id"]
+
+    monkeypatch.setattr(action_routes, "CLIP_MAX_BYTES", 16)
+    files = [
+        ("files", ("clip1.mp4", create_fake_clip_bytes(1), "video/mp4")),
+        ("files", ("clip2.mp4", b"x" * 17, "video/mp4")),
+    ]
+    upload_resp = await client.post("/upload", headers=headers, files=files)
+    assert upload_resp.status_code == 413
+
+    last_resp = await client.get("/action/last", headers=headers)
+    assert last_resp.json()["action_id"] == action_id
+
+@pytest.mark.asyncio
+async def test_stream_clip_ranges_and_etag(client):
+    email = f"stream_{uuid.uuid4().hex[:6]}@example.com"
+    password = "TestPass123"
+    await client.post("/register", json={
+        "email": email,
+        "password": password,
+        "confirm_password": password
+    })
+    login_resp = await client.post(
+        "/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    token = login_resp.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    files = [
+        ("files", ("clip1.mp4", create_fake_clip_bytes(1), "video/mp4")),
+        ("files", ("clip2.mp4", create_fake_clip_bytes(2), "video/mp4")),
+    ]
+    await client.post("/upload", headers=headers, files=files)
+    clip = (await client.get("/action/last", headers=headers)).json()["clips"][0]
+    content = create_fake_clip_bytes(1)
+
+    # Byte range
+    resp = await client.get(clip["url"], headers={"Range": "bytes=5-11"})
+    assert resp.status_code == 206
+    assert resp.content == content[5:12]
+    assert resp.headers["content-range"] == f"bytes 5-11/{len(content)}"
+
+    # Suffix range
+    resp = await client.get(clip["url"], headers={"Range": "bytes=-1"})
+    assert resp.status_code == 206
+    assert resp.content == content[-1:]
+
+    # Multiple ranges are not supported, the whole clip is sent
+    resp = await client.get(clip["url"], headers={"Range": "bytes=0-1,5-6"})
+    assert resp.status_code == 200
+    assert resp.content == content
+
+    # Unsatisfiable range
+    resp = await client.get(clip["url"], headers={"Range": "bytes=1000-"})
+    assert resp.status_code == 416
+
+    # Conditional GET
+    etag = resp.headers["etag"]
+    assert etag == f'"{clip["sha256"]}"'
+    resp = await client.get(clip["url"], headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+
+    # The token only grants access to its own clip
+    other_url = clip["url"].replace(f"/clips/{clip['id']}/", f"/clips/{clip['id'] + 1}/")
+    resp = await client.get(other_url)
+    assert resp.status_code == 401
+
+@pytest.mark.asyncio
+async def test_clip_metadata_without_content(client, db):
+    email = f"metadata_{uuid.uuid4().hex[:6]}@example.com"
+    password = "TestPass123"
+    await client.post("/register", json={
+        "email": email,
+        "password": password,
+        "confirm_password": password
+    })
+    login_resp = await client.post(
+        "/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    token = login_resp.json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+
+    videos = ["tests/assets/videos/clip_0.mp4", "tests/assets/videos/clip_1.mp4"]
+    files = []
+    for i, path in enumerate(videos):
+        with open(path, "rb") as f:
+            files.append(("files", (f"clip{i}.mp4", f.read(), "video/mp4")))
+    upload_resp = await client.post("/upload", headers=headers, files=files)
+    action_id = upload_resp.json()["action_id"]
+
+    clips = (await client.get("/action/last", headers=headers)).json()["clips"]
+    assert all(clip["duration_seconds"] > 0 for clip in clips)
+
+    # Loading a clip leaves its legacy video bytes in the database
+    clip = db.query(Clip).filter(Clip.action_id == action_id).first()
+    assert "content" in inspect(clip).unloaded
+    assert "duration_seconds" not in inspect(clip).unloaded
+
+def seed_actions(db, user_id: int, num_actions: int):
+    for i in range(num_actions):
+        action = Action(user_id=user_id)
+        action.clips = [
+            Clip(storage_key=f"{user_id}-{i}-{j}", features=[ClipFeature(backbone="x3d", model_version="1", dim=1, vector=b"0000")])
+            for j in range(2)
+        ]
+        action.prediction = Prediction(
+            is_foul=False, foul_confidence=0, no_foul_confidence=100, foul_model_results=[],
+            no_card_confidence=100, red_card_confidence=0, yellow_card_confidence=0, severity_model_results=[],
+        )
+        db.add(action)
+    db.commit()
+
+@pytest.mark.parametrize("num_actions", [1, 20])
+def test_replace_action_is_set_based(db, num_actions):
+    user = User(email=f"replace_{uuid.uuid4().hex[:6]}@example.com", password="x")
+    db.add(user)
+    db.commit()
+    user_id = user.id
+    seed_actions(db, user_id, num_actions)
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.get_bind(), "before_cursor_execute", listener)
+    try:
+        stored = [StoredClip(key=f"new-{user_id}-{i}", size=1, sha256=f"new-{user_id}-{i}") for i in range(3)]
+        action_id = action_routes.replace_action(db, user_id, stored, [1.5, None, 2.0])
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+    # Same statements whatever the history of the user
+    assert len(statements) == 6
+    assert [a.id for a in db.query(Action).filter(Action.user_id == user_id)] == [action_id]
+    clips = db.query(Clip).filter(Clip.action_id == action_id).order_by(Clip.id).all()
+    assert [clip.duration_seconds for clip in clips] == [1.5, None, 2.0]
+    assert db.query(Clip).filter(Clip.storage_key.like(f"{user_id}-%")).count() == 0
+    assert db.query(ClipFeature).filter(ClipFeature.clip_id.notin_(db.query(Clip.id))).count() == 0
+    assert db.query(Prediction).filter(Prediction.action_id.notin_(db.query(Action.id))).count() == 0
+
+@pytest.mark.asyncio
+async def test_stream_clip_without_video(client, db):
+    user = User(email=f"novideo_{uuid.uuid4().hex[:6]}@example.com", password="x")
+    user.actions = [Action(clips=[Clip()])]
+    db.add(user)
+    db.commit()
+    clip_id = user.actions[0].clips[0].id
+
+    resp = await client.get(f"/clips/{clip_id}/stream", params={"token": create_clip_token(clip_id)})
+    assert resp.status_code == 404
+
+def test_parse_range_of_empty_clip():
+    with pytest.raises(action_routes.RangeNotSatisfiable):
+        action_routes.parse_range("bytes=-10", 0)
+    with pytest.raises(action_routes.RangeNotSatisfiable):
+        action_routes.parse_range("bytes=0-", 0)
+    assert action_routes.parse_range("bytes=-10", 4) == (0, 3)
+
+def test_parse_range_ignores_unsupported_ranges():
+    assert action_routes.parse_range("bytes=0-1,4-5", 10) is None
+    assert action_routes.parse_range("items=0-1", 10) is None
+    assert action_routes.parse_range("bytes=5-2", 10) is None
+    assert action_routes.parse_range("bytes=a-", 10) is None
@@ -109,4 +109,47 @@ async def test_login_nonexistent_user(client):
     )
 
     assert response.status_code == 401
-    assert response.json()["detail"] == "Incorrect username or password"
\ No newline at end of file
+    assert response.json()["detail"] == "Incorrect username or password"
+
+@pytest.mark.asyncio
+async def test_login_upgrades_outdated_hash(client, db):
+    from app.auth.passwords import pwd_context as current_context
+
+    email = f"rehash_{uuid.uuid4().hex[:6]}@example.com"
+    password = "Str0ngPass123"
+    weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash(password)
+    db.add(User(email=email, password=weak_hash))
+    db.commit()
+
+    response = await client.post(
+        "/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+
+    db.expire_all()
+    stored = db.query(User).filter(User.email == email).first().password
+    assert stored != weak_hash
+    assert not current_context.needs_update(stored)
+    assert current_context.verify(password, stored)
+
+@pytest.mark.asyncio
+async def test_login_keeps_stronger_hash(client, db):
+    from app.auth.passwords import BCRYPT_ROUNDS
+
+    email = f"strong_{uuid.uuid4().hex[:6]}@example.com"
+    password = "Str0ngPass123"
+    strong_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=BCRYPT_ROUNDS + 1).hash(password)
+    db.add(User(email=email, password=strong_hash))
+    db.commit()
+
+    response = await client.post(
+        "/login",
+        data={"username": email, "password": password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"}
+    )
+    assert response.status_code == 200
+
+    db.expire_all()
+    assert db.query(User).filter(User.email == email).first().password == strong_hash
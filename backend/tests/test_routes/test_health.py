@@ -0,0 +1,29 @@
+import pytest
+
+@pytest.mark.asyncio
+async def test_readiness_before_warm_up(client):
+    # The lifespan does not warm up the backbones in the test environment
+    response = await client.get("/health/ready")
+    assert response.status_code == 503
+    data = response.json()
+    assert data["ready"] is False
+    assert set(data["models"]) == {"mvit", "x3d", "slowfast"}
+
+@pytest.mark.asyncio
+async def test_readiness_reports_ensembles(client):
+    response = await client.get("/health/ready")
+    assert set(response.json()["ensembles"]) == {"foul", "severity"}
+
+@pytest.mark.asyncio
+async def test_startup_profile(client):
+    response = await client.get("/health/startup")
+    assert response.status_code == 200
+    data = response.json()
+    assert set(data) == {"imports", "loads", "total_import_seconds", "total_load_seconds"}
+    assert set(data["loads"]) == {"mvit", "x3d", "slowfast", "foul", "severity"}
+
+@pytest.mark.asyncio
+async def test_password_hashing_status(client):
+    response = await client.get("/health/passwords")
+    assert response.status_code == 200
+    assert set(response.json()) == {"workers", "queue_size", "active", "queued", "max_queued", "rejected"}
@@ -1,12 +1,61 @@
 import pytest
 from io import BytesIO
 from sqlalchemy.orm import Session
-from app.db.models import Action, Clip, Prediction, User
+from app.db.models import Action, Clip, ClipFeature, Prediction, User
 from app.db.database import get_db
 from main import app
 from httpx import AsyncClient
+import asyncio
+import threading
 import uuid
 
+import numpy as np
+import app.predict.routes as predict_routes
+from app.models.predictor import BACKBONE_VERSIONS
+from app.storage.clip_store import clip_store
+from app.predict.jobs import JOB_FAILED_MESSAGE, JobManager
+
+FAKE_RESULTS = {
+    "is_foul": True,
+    "foul_confidence": 66.67,
+    "no_foul_confidence": 33.33,
+    "foul_model_results": [{"model": "Foul Model 1", "prediction": 1}],
+    "severity": {"no_card": 0.0, "red_card": 33.33, "yellow_card": 66.67},
+    "severity_model_results": [{"model": "Severity Model 1", "prediction": 2}],
+    "metadata": {"timings": {}},
+}
+
+def fake_predict(video_paths, known_features=None):
+    # Every clip gets a feature vector per backbone, as the real predictor does
+    clip_features = [
+        {name: np.full(4, i, dtype=np.float32) for name in BACKBONE_VERSIONS}
+        for i in range(len(video_paths))
+    ]
+    return {**FAKE_RESULTS, "clip_features": clip_features}
+
+# ---------------- Helpers ---------------- #
+
+async def upload_test_clips(client: AsyncClient, headers: dict) -> int:
+    with open("tests/assets/videos/clip_0.mp4", "rb") as f1, open("tests/assets/videos/clip_1.mp4", "rb") as f2:
+        files = [
+            ("files", ("clip_0.mp4", f1, "video/mp4")),
+            ("files", ("clip_1.mp4", f2, "video/mp4")),
+        ]
+        response = await client.post("/upload", files=files, headers=headers)
+    assert response.status_code == 200
+    return response.json()["action_id"]
+
+async def wait_for_job(client: AsyncClient, job_id: str, headers: dict, timeout: float = 600) -> dict:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while loop.time() < deadline:
+        response = await client.get(f"/predict/jobs/{job_id}", headers=headers)
+        assert response.status_code == 200
+        if response.json()["status"] in ("completed", "failed"):
+            return response.json()
+        await asyncio.sleep(0.1)
+    raise TimeoutError(f"Prediction job {job_id} did not finish")
+
 # ---------------- Fixtures ---------------- #
 
 @pytest.fixture
@@ -46,8 +95,10 @@ async def test_upload_and_predict(client: AsyncClient, test_user, override_get_d
     action_id = response.json()["action_id"]
 
     response = await client.post(f"/predict/{action_id}", headers=headers)
-    assert response.status_code == 200
-    assert "results" in response.json()
+    assert response.status_code == 202
+    job = await wait_for_job(client, response.json()["job_id"], headers)
+    assert job["status"] == "completed"
+    assert "results" in job["result"]
 
 
 @pytest.mark.asyncio
@@ -67,9 +118,120 @@ async def test_get_prediction(client: AsyncClient, test_user, override_get_db):
     action_id = response.json()["action_id"]
 
     response = await client.post(f"/predict/{action_id}", headers=headers)
-    assert response.status_code == 200
+    assert response.status_code == 202
+    job = await wait_for_job(client, response.json()["job_id"], headers)
+    assert job["status"] == "completed"
 
     response = await client.get(f"/predict/{action_id}", headers=headers)
     assert response.status_code == 200
     assert "results" in response.json()
-    assert len(response.json()["results"]) == 1
\ No newline at end of file
+    assert len(response.json()["results"]) == 1
+
+@pytest.mark.asyncio
+async def test_predict_job_stores_prediction(client: AsyncClient, test_user, monkeypatch):
+    test_user_data = await test_user
+    headers = {"Authorization": f"Bearer {test_user_data['token']}"}
+    monkeypatch.setattr(predict_routes, "predict", fake_predict)
+
+    action_id = await upload_test_clips(client, headers)
+
+    response = await client.post(f"/predict/{action_id}", headers=headers)
+    assert response.status_code == 202
+    assert response.json()["status"] in ("queued", "running", "completed")
+
+    job = await wait_for_job(client, response.json()["job_id"], headers)
+    assert job["status"] == "completed"
+    assert job["result"]["results"][0]["is_foul"] is True
+
+    response = await client.get(f"/predict/{action_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["results"][0]["foul_confidence"] == 66.67
+
+@pytest.mark.asyncio
+async def test_predict_reuses_stored_features(client: AsyncClient, test_user, db, monkeypatch):
+    test_user_data = await test_user
+    headers = {"Authorization": f"Bearer {test_user_data['token']}"}
+    calls = []
+    def recording_predict(video_paths, known_features=None):
+        calls.append((list(video_paths), known_features))
+        return fake_predict(video_paths, known_features)
+    monkeypatch.setattr(predict_routes, "predict", recording_predict)
+
+    action_id = await upload_test_clips(client, headers)
+    clip_ids = [clip.id for clip in db.query(Clip).filter(Clip.action_id == action_id).order_by(Clip.id)]
+
+    for _ in range(2):
+        response = await client.post(f"/predict/{action_id}", headers=headers)
+        job = await wait_for_job(client, response.json()["job_id"], headers)
+        assert job["status"] == "completed"
+
+    # The first run stores one vector per clip and backbone
+    stored = db.query(ClipFeature).filter(ClipFeature.clip_id.in_(clip_ids)).all()
+    assert len(stored) == len(clip_ids) * len(BACKBONE_VERSIONS)
+    assert all(row.dim == 4 for row in stored)
+
+    # The second run gets every feature from the database and decodes nothing
+    first_paths, first_known = calls[0]
+    second_paths, second_known = calls[1]
+    # Clips are read in place from the clip store
+    assert all(path.startswith(clip_store.root) for path in first_paths)
+    assert first_known == [{}, {}]
+    assert second_paths == [None, None]
+    assert np.array_equal(second_known[1]["mvit"], np.full(4, 1, dtype=np.float32))
+
+@pytest.mark.asyncio
+async def test_predict_queue_full(client: AsyncClient, test_user, monkeypatch):
+    test_user_data = await test_user
+    headers = {"Authorization": f"Bearer {test_user_data['token']}"}
+
+    # A single worker with no queue, blocked until the test releases it
+    release = threading.Event()
+    def blocking_predict(video_paths, known_features=None):
+        release.wait(timeout=10)
+        return fake_predict(video_paths, known_features)
+    monkeypatch.setattr(predict_routes, "predict", blocking_predict)
+    monkeypatch.setattr(predict_routes, "jobs", JobManager(workers=1, queue_size=0))
+
+    action_id = await upload_test_clips(client, headers)
+
+    first = await client.post(f"/predict/{action_id}", headers=headers)
+    assert first.status_code == 202
+
+    second = await client.post(f"/predict/{action_id}", headers=headers)
+    assert second.status_code == 429
+
+    release.set()
+    job = await wait_for_job(client, first.json()["job_id"], headers)
+    assert job["status"] == "completed"
+
+@pytest.mark.asyncio
+async def test_predict_job_not_found(client: AsyncClient, test_user):
+    test_user_data = await test_user
+    headers = {"Authorization": f"Bearer {test_user_data['token']}"}
+
+    response = await client.get("/predict/jobs/unknown", headers=headers)
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_failed_job_hides_the_exception(client: AsyncClient, test_user, monkeypatch):
+    test_user_data = await test_user
+    headers = {"Authorization": f"Bearer {test_user_data['token']}"}
+
+    def failing_predict(video_paths, known_features=None):
+        raise RuntimeError("/srv/models/x3d.pt: checksum mismatch")
+    monkeypatch.setattr(predict_routes, "predict", failing_predict)
+
+    action_id = await upload_test_clips(client, headers)
+    response = await client.post(f"/predict/{action_id}", headers=headers)
+    job = await wait_for_job(client, response.json()["job_id"], headers)
+
+    assert job["status"] == "failed"
+    assert job["error"] == JOB_FAILED_MESSAGE
+
+def test_finished_jobs_expire_without_new_submissions():
+    manager = JobManager(workers=1, queue_size=0, ttl=0)
+    job = manager.submit(lambda: "done", user_id=1, action_id=1)
+    manager._executor.shutdown(wait=True)
+
+    assert job.status == "completed"
+    assert manager.get(job.id) is None
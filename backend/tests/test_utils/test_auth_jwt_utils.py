@@ -1,11 +1,11 @@
 import pytest
 from datetime import timedelta
 from jose import jwt
-from app.auth.jwt_utils import create_access_token, verify_token, get_current_user, SECRET_KEY, ALGORITHM
+from app.auth.jwt_utils import create_access_token, create_clip_token, verify_token, get_current_user, SECRET_KEY, ALGORITHM
 from app.db.models import User
 from fastapi import HTTPException
-from sqlalchemy.orm import Session
-from unittest.mock import MagicMock
+from sqlalchemy.ext.asyncio import AsyncSession
+from unittest.mock import AsyncMock, MagicMock
 from time import sleep
 
 def test_create_access_token_contains_expected_fields():
@@ -31,7 +31,8 @@ def test_verify_token_expired():
     token = create_access_token({"sub": email}, expires_delta=timedelta(seconds=-1))
     assert verify_token(token) is None
 
-def test_get_current_user_valid(monkeypatch):
+@pytest.mark.asyncio
+async def test_get_current_user_valid(monkeypatch):
     email = "authuser@example.com"
     token = create_access_token({"sub": email})
     auth_header = f"Bearer {token}"
@@ -41,32 +42,41 @@ def test_get_current_user_valid(monkeypatch):
     fake_user.id = 1
     fake_user.email = email
 
-    db_mock = MagicMock(spec=Session)
-    db_mock.query().filter().first.return_value = fake_user
+    db_mock = MagicMock(spec=AsyncSession)
+    db_mock.scalar = AsyncMock(return_value=fake_user)
 
-    user = get_current_user(authorization=auth_header, db=db_mock)
+    user = await get_current_user(authorization=auth_header, db=db_mock)
     assert user.email == email
 
-def test_get_current_user_invalid_token():
+@pytest.mark.asyncio
+async def test_get_current_user_invalid_token():
     auth_header = "Bearer invalid.token.value"
     with pytest.raises(HTTPException) as exc_info:
-        get_current_user(authorization=auth_header, db=MagicMock())
+        await get_current_user(authorization=auth_header, db=MagicMock())
     assert exc_info.value.status_code == 401
 
-def test_get_current_user_user_not_found(monkeypatch):
+@pytest.mark.asyncio
+async def test_get_current_user_user_not_found(monkeypatch):
     email = "missing@example.com"
     token = create_access_token({"sub": email})
     auth_header = f"Bearer {token}"
 
-    db_mock = MagicMock(spec=Session)
-    db_mock.query().filter().first.return_value = None
+    db_mock = MagicMock(spec=AsyncSession)
+    db_mock.scalar = AsyncMock(return_value=None)
 
     with pytest.raises(HTTPException) as exc_info:
-        get_current_user(authorization=auth_header, db=db_mock)
+        await get_current_user(authorization=auth_header, db=db_mock)
     assert exc_info.value.status_code == 404
 
-def test_get_current_user_no_bearer_prefix():
+@pytest.mark.asyncio
+async def test_get_current_user_no_bearer_prefix():
     auth_header = "Token abc.def.ghi"
     with pytest.raises(HTTPException) as exc_info:
-        get_current_user(authorization=auth_header, db=MagicMock())
+        await get_current_user(authorization=auth_header, db=MagicMock())
     assert exc_info.value.status_code == 401
+
+def test_clip_token_is_stable_and_scoped():
+    token = create_clip_token(7)
+    assert token == create_clip_token(7)
+    assert verify_token(token)["clip"] == 7
+    assert "sub" not in verify_token(token)
@@ -0,0 +1,82 @@
+import io
+import os
+import time
+import pytest
+from starlette.datastructures import UploadFile
+from app.storage.clip_store import ClipStore, LocalClipStore, ClipTooLarge, create_clip_store
+
+@pytest.mark.asyncio
+async def test_save_upload_streams_to_disk(tmp_path):
+    store = LocalClipStore(str(tmp_path))
+    upload = UploadFile(io.BytesIO(b"video-bytes" * 100), filename="clip.mp4")
+
+    stored = await store.save_upload(upload, max_bytes=10_000)
+
+    assert stored.size == 1100
+    assert stored.key == stored.sha256
+    assert len(stored.sha256) == 64
+    assert store.read(stored.key) == b"video-bytes" * 100
+
+    store.delete(stored.key)
+    assert not os.path.exists(store.path(stored.key))
+
+@pytest.mark.asyncio
+async def test_save_upload_rejects_large_clips(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.storage.clip_store.UPLOAD_CHUNK_SIZE", 4)
+    store = LocalClipStore(str(tmp_path))
+    upload = UploadFile(io.BytesIO(b"x" * 20), filename="clip.mp4")
+
+    with pytest.raises(ClipTooLarge):
+        await store.save_upload(upload, max_bytes=10)
+
+    # The partial file is removed
+    assert [files for _, _, files in os.walk(tmp_path) if files] == []
+
+@pytest.mark.asyncio
+async def test_save_upload_writes_in_the_threadpool(tmp_path, monkeypatch):
+    calls = []
+    async def record(func, *args):
+        calls.append(func.__name__)
+        return func(*args)
+    monkeypatch.setattr("app.storage.clip_store.run_in_threadpool", record)
+    store = LocalClipStore(str(tmp_path))
+
+    await store.save_upload(UploadFile(io.BytesIO(b"video-bytes"), filename="clip.mp4"))
+
+    assert calls == ["__enter__", "write", "__exit__"]
+
+def test_identical_clips_share_a_key(tmp_path):
+    store = LocalClipStore(str(tmp_path))
+    first = store.save_bytes(b"same-video")
+    second = store.save_bytes(b"same-video")
+
+    assert first.key == second.key
+    assert store.local_path(first.key) == store.path(first.key)
+    with store.open(first.key) as f:
+        assert f.read() == b"same-video"
+
+def test_delete_keeps_clips_written_since(tmp_path):
+    store = LocalClipStore(str(tmp_path))
+    stored = store.save_bytes(b"video")
+    old = time.time() - 60
+    os.utime(store.path(stored.key), (old, old))
+
+    assert list(store.list_clips()) == [(stored.key, old)]
+    # Written again after the cutoff, e.g. by an upload of the same video
+    assert not store.delete(stored.key, written_before=old - 1)
+    assert store.read(stored.key) == b"video"
+    assert store.delete(stored.key, written_before=time.time() + 1)
+    assert list(store.list_clips()) == []
+    assert not store.delete(stored.key)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_clip_store("s3")
+
+def test_incomplete_backend_cannot_be_created():
+    class ReadOnlyClipStore(ClipStore):
+        def open(self, key):
+            return open(key, "rb")
+
+    with pytest.raises(TypeError):
+        ReadOnlyClipStore()
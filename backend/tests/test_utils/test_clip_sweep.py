@@ -0,0 +1,59 @@
+import os
+import time
+import uuid
+
+from app.db.models import Action, Clip, User
+from app.storage.clip_store import LocalClipStore
+from app.storage.sweep import sweep_clips
+
+def age(store, key, seconds):
+    written_at = time.time() - seconds
+    os.utime(store.path(key), (written_at, written_at))
+
+def test_sweep_deletes_old_unreferenced_clips(db, tmp_path):
+    store = LocalClipStore(str(tmp_path))
+    referenced = store.save_bytes(f"referenced-{uuid.uuid4()}".encode())
+    unreferenced = store.save_bytes(f"unreferenced-{uuid.uuid4()}".encode())
+    recent = store.save_bytes(f"recent-{uuid.uuid4()}".encode())
+    age(store, referenced.key, 7200)
+    age(store, unreferenced.key, 7200)
+
+    user = User(email=f"sweep_{uuid.uuid4().hex[:6]}@example.com", password="x")
+    user.actions = [Action(clips=[Clip(storage_key=referenced.key)])]
+    db.add(user)
+    db.commit()
+
+    assert sweep_clips(db, store, grace_seconds=3600) == 1
+    assert sorted(key for key, _ in store.list_clips()) == sorted([referenced.key, recent.key])
+
+def test_sweep_keeps_clips_written_again_by_an_upload(db, tmp_path, monkeypatch):
+    store = LocalClipStore(str(tmp_path))
+    content = f"reused-{uuid.uuid4()}".encode()
+    stored = store.save_bytes(content)
+    age(store, stored.key, 7200)
+
+    # An upload stores the same video after the sweep listed it as old and unreferenced
+    list_clips = store.list_clips
+    def list_then_upload():
+        clips = list(list_clips())
+        store.save_bytes(content)
+        return clips
+    monkeypatch.setattr(store, "list_clips", list_then_upload)
+
+    assert sweep_clips(db, store, grace_seconds=3600) == 0
+    assert store.read(stored.key) == content
+
+def test_sweep_removes_old_temporary_files(db, tmp_path):
+    store = LocalClipStore(str(tmp_path))
+    tmp_dir = tmp_path / "tmp"
+    tmp_dir.mkdir()
+    interrupted = tmp_dir / "tmpinterrupted"
+    in_progress = tmp_dir / "tmpinprogress"
+    interrupted.write_bytes(b"partial upload")
+    in_progress.write_bytes(b"upload being written")
+    written_at = time.time() - 7200
+    os.utime(interrupted, (written_at, written_at))
+
+    assert sweep_clips(db, store, grace_seconds=3600) == 0
+    assert not interrupted.exists()
+    assert in_progress.exists()
@@ -0,0 +1,88 @@
+import json
+import os
+import pickle
+
+import numpy as np
+import pytest
+from app.models.ensemble import ENSEMBLE_MANIFEST, EnsembleError, load_ensemble, read_manifest, vote
+from tests.fakes import FakeClassifier
+
+MODELS_DIR = os.path.dirname(ENSEMBLE_MANIFEST)
+
+@pytest.mark.parametrize("task", ["foul", "severity"])
+def test_ensemble_maps_each_classifier_to_its_backbone(task):
+    classifiers = load_ensemble(task)
+
+    assert [c.backbone for c in classifiers] == ["mvit", "x3d", "slowfast"]
+    for classifier in classifiers:
+        # The file names of the trained classifiers name their backbone
+        assert classifier.backbone in classifier.name
+
+@pytest.mark.parametrize("task", ["foul", "severity"])
+def test_native_classifiers_match_pickles(task):
+    features = np.random.default_rng(0).normal(size=(20, 400)).astype(np.float32)
+    entries = read_manifest()["ensembles"][task]["models"]
+
+    for classifier, entry in zip(load_ensemble(task), entries):
+        with open(os.path.join(MODELS_DIR, entry["source"]), "rb") as f:
+            original = pickle.load(f)
+        assert np.allclose(classifier.predict_proba(features), original.predict_proba(features))
+        assert np.array_equal(classifier.predict(features), original.predict(features))
+
+def test_classifier_rejects_wrong_feature_shape():
+    classifier = load_ensemble("foul")[0]
+    with pytest.raises(EnsembleError):
+        classifier.predict_proba(np.zeros((1, 512), dtype=np.float32))
+
+def write_manifest(tmp_path, manifest):
+    path = tmp_path / "ensemble.json"
+    path.write_text(json.dumps(manifest))
+    return str(path)
+
+def test_load_validates_feature_dim(tmp_path):
+    manifest = read_manifest()
+    entry = dict(manifest["ensembles"]["foul"]["models"][0], feature_dim=512, file=os.path.join(MODELS_DIR, "foul/foul_mvit.ubj"))
+    path = write_manifest(tmp_path, {"ensembles": {"foul": {"classes": [0, 1], "models": [entry]}}})
+
+    with pytest.raises(EnsembleError, match="features"):
+        load_ensemble("foul", path)
+
+def test_load_validates_checksum_and_backbones(tmp_path):
+    manifest = read_manifest()
+    entry = dict(manifest["ensembles"]["foul"]["models"][0], file=os.path.join(MODELS_DIR, "foul/foul_mvit.ubj"))
+
+    path = write_manifest(tmp_path, {"ensembles": {"foul": {"classes": [0, 1], "models": [dict(entry, sha256="0" * 64)]}}})
+    with pytest.raises(EnsembleError, match="Checksum"):
+        load_ensemble("foul", path)
+
+    path = write_manifest(tmp_path, {"ensembles": {"foul": {"classes": [0, 1], "models": [entry, entry]}}})
+    with pytest.raises(EnsembleError, match="same backbone"):
+        load_ensemble("foul", path)
+
+FAKE_FEATURES = {name: np.zeros((1, 400), dtype=np.float32) for name in ("mvit", "x3d", "slowfast")}
+
+def fake_ensemble():
+    return [
+        FakeClassifier("mvit", [0.1, 0.5, 0.4]),
+        FakeClassifier("x3d", [0.1, 0.45, 0.45]),
+        FakeClassifier("slowfast", [0.0, 0.2, 0.8]),
+    ]
+
+def test_hard_vote_counts_predictions():
+    classifiers = fake_ensemble()
+    result = vote(classifiers, FAKE_FEATURES, voting="hard", label="Severity Model")
+
+    assert result["percentages"] == pytest.approx({0: 0.0, 1: 200 / 3, 2: 100 / 3})
+    assert [r["prediction"] for r in result["model_results"]] == [1, 1, 2]
+    assert result["model_results"][0]["model"] == "Severity Model 1"
+    assert result["model_results"][2]["probabilities"] == pytest.approx([0.0, 0.2, 0.8])
+    # Each classifier runs once
+    assert all(c.calls == 1 for c in classifiers)
+
+def test_soft_vote_averages_probabilities():
+    result = vote(fake_ensemble(), FAKE_FEATURES, voting="soft")
+    assert result["percentages"] == pytest.approx({0: 20 / 3, 1: 115 / 3, 2: 165 / 3})
+
+def test_unknown_voting_method():
+    with pytest.raises(ValueError):
+        vote(fake_ensemble(), FAKE_FEATURES, voting="median")
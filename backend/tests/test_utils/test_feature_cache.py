@@ -0,0 +1,44 @@
+import io
+
+import numpy as np
+from app.models.feature_cache import FeatureCache, clip_sha256, feature_key
+
+def test_feature_key_depends_on_backbone_and_version():
+    keys = {
+        feature_key("abc", "mvit", "1"),
+        feature_key("abc", "mvit", "2"),
+        feature_key("abc", "x3d", "1"),
+    }
+    assert len(keys) == 3
+
+def test_clip_sha256_from_memory():
+    expected = "22239e906240b3fad8b3bafd325cf31ee4c8d3eb65c337746ac9fa0659bb45bb"
+    assert clip_sha256(b"clip-content") == expected
+
+    stream = io.BytesIO(b"clip-content")
+    assert clip_sha256(stream, chunk_size=4) == expected
+    assert stream.read() == b"clip-content"
+
+def test_lru_evicts_least_recently_used():
+    cache = FeatureCache(max_entries=2, disk_dir="")
+    cache.put("a", np.zeros(4))
+    cache.put("b", np.ones(4))
+    cache.get("a")
+    cache.put("c", np.ones(4))
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert len(cache) == 2
+
+def test_disk_tier_survives_memory_eviction(tmp_path):
+    cache = FeatureCache(max_entries=1, disk_dir=str(tmp_path))
+    cache.put("a", np.arange(4))
+    cache.put("b", np.ones(4))
+
+    features = cache.get("a")
+    assert features.dtype == np.float32
+    assert np.array_equal(features, np.arange(4))
+
+    # A new cache on the same directory reads the stored vectors
+    assert np.array_equal(FeatureCache(disk_dir=str(tmp_path)).get("b"), np.ones(4))
@@ -0,0 +1,108 @@
+import io
+
+import cv2
+import numpy as np
+import pytest
+from app.models.frames import ClipFrames, decode_clip, open_video_source, read_frames, sample_frames, sample_indices
+
+VIDEO_PATH = "tests/assets/videos/clip_0.mp4"
+
+def test_decode_clip_shares_frames_between_views():
+    clip = decode_clip(VIDEO_PATH, start_frame=50, end_frame=80, num_samples=16)
+
+    assert len(clip) > 0
+    assert clip.frames.shape[1:] == (224, 224, 3)
+    assert len(clip.samples) == 16
+
+    head = clip.head(32)
+    assert head.shape == (32, 3, 224, 224)
+    assert np.array_equal(head[0], np.transpose(clip.frames[0], (2, 0, 1)))
+
+    strided = clip.strided(8, min_frames=32)
+    assert strided.shape == (8, 3, 224, 224)
+
+def test_views_pad_short_clips_with_last_frame():
+    frames = np.stack([np.full((4, 4, 3), i, dtype=np.uint8) for i in range(3)])
+    clip = ClipFrames(frames, [])
+
+    head = clip.head(5)
+    assert [int(f[0, 0, 0]) for f in head] == [0, 1, 2, 2, 2]
+
+    strided = clip.strided(3, min_frames=5)
+    assert [int(f[0, 0, 0]) for f in strided] == [0, 2, 2]
+
+def test_sample_frames_matches_decoded_samples():
+    samples = sample_frames(VIDEO_PATH, start_frame=50, end_frame=80, num_frames=16)
+    clip = decode_clip(VIDEO_PATH, start_frame=50, end_frame=80, num_samples=16)
+
+    assert len(samples) == 16
+    assert all(np.array_equal(a, b) for a, b in zip(samples, clip.samples))
+
+def test_read_frames_repeats_and_stops_at_end():
+    cap = cv2.VideoCapture(VIDEO_PATH)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = read_frames(cap, [0, 0, 2, total_frames + 5])
+    cap.release()
+
+    assert len(frames) == 3
+    assert np.array_equal(frames[0], frames[1])
+
+def write_video(path, num_frames, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), 25, size)
+    for i in range(num_frames):
+        writer.write(np.full((size[1], size[0], 3), i % 256, dtype=np.uint8))
+    writer.release()
+
+def test_decode_clip_keeps_only_needed_frames(tmp_path):
+    path = tmp_path / "long.mp4"
+    write_video(path, 300)
+
+    clip = decode_clip(str(path), frame_size=(32, 32), start_frame=50, end_frame=80, num_samples=16, head_frames=32, strided_frames=8)
+
+    assert len(clip) == 300
+    # 32 head frames plus the strided ones past them, never the whole clip
+    assert len(clip.frames) <= 32 + 8
+    assert clip.head(32).shape == (32, 3, 32, 32)
+    strided = clip.strided(8, min_frames=32)
+    assert strided.shape == (8, 3, 32, 32)
+    assert np.array_equal(strided[-1], clip.take([299])[0])
+    assert clip.samples.shape == (16, 48, 64, 3)
+
+def test_decode_clip_short_clip_repeats_last_frame(tmp_path):
+    path = tmp_path / "short.mp4"
+    write_video(path, 5)
+
+    clip = decode_clip(str(path), frame_size=(32, 32), start_frame=50, end_frame=80, num_samples=4)
+
+    assert len(clip) == 5
+    head = clip.head(8)
+    assert all(np.array_equal(frame, head[4]) for frame in head[4:])
+    # The MViT range is past the end, every sample is the last frame
+    assert clip.samples.shape[0] == 4
+
+def test_sample_indices_clamps_range():
+    indices = sample_indices(total_frames=40, start_frame=50, end_frame=80, num_frames=4)
+    assert list(indices) == [39, 39, 39, 39]
+
+def test_decode_clip_invalid_path():
+    with pytest.raises(ValueError):
+        decode_clip("tests/assets/videos/missing.mp4")
+
+@pytest.mark.parametrize("make_source", [lambda content: content, io.BytesIO])
+def test_decode_clip_from_memory_matches_path(make_source):
+    with open(VIDEO_PATH, "rb") as f:
+        content = f.read()
+
+    from_path = decode_clip(VIDEO_PATH, start_frame=50, end_frame=80, num_samples=16)
+    from_memory = decode_clip(make_source(content), start_frame=50, end_frame=80, num_samples=16)
+
+    assert np.array_equal(from_memory.frames, from_path.frames)
+    assert all(np.array_equal(a, b) for a, b in zip(from_memory.samples, from_path.samples))
+
+def test_open_video_source_keeps_paths():
+    with open_video_source(VIDEO_PATH) as path:
+        assert path == VIDEO_PATH
+
+def test_decode_clip_invalid_bytes():
+    with pytest.raises(ValueError, match="bytes in memory"):
+        decode_clip(b"not a video")
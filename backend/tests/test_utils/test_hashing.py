@@ -0,0 +1,6 @@
+from app.utils.hashing import file_sha256
+
+def test_file_sha256(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(b"clip-content")
+    assert file_sha256(str(path), chunk_size=4) == "22239e906240b3fad8b3bafd325cf31ee4c8d3eb65c337746ac9fa0659bb45bb"
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import torch
+from app.models import predictor
+from app.models.config import backbone_backend, feature_version
+from app.models.inference import optimize_model, prepare_input
+
+VIDEO_PATHS = ["tests/assets/videos/clip_0.mp4", "tests/assets/videos/clip_1.mp4"]
+
+# Tolerance of each backend against the eager features
+BACKEND_TOLERANCES = {
+    "compile": {"atol": 1e-3, "min_cosine": 0.9999},
+    "int8": {"atol": None, "min_cosine": 0.95},
+}
+
+EXTRACTORS = {
+    "mvit": (predictor.load_mvit_model, predictor.extract_features_mvit),
+    "x3d": (predictor.load_x3d_model, predictor.extract_features_x3d),
+    "slowfast": (predictor.load_slowfast_model, predictor.extract_features_slowfast),
+}
+
+def tiny_model():
+    return torch.nn.Sequential(torch.nn.Conv3d(3, 4, 3), torch.nn.Flatten(), torch.nn.Linear(4 * 2 * 2 * 2, 5)).eval()
+
+def test_int8_quantizes_linear_layers():
+    model = optimize_model(tiny_model(), backend="int8")
+    assert isinstance(model[2], torch.ao.nn.quantized.dynamic.Linear)
+
+def test_channels_last_input():
+    frames = prepare_input(torch.zeros(1, 3, 4, 8, 8), channels_last=True)
+    assert frames.is_contiguous(memory_format=torch.channels_last_3d)
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        optimize_model(tiny_model(), backend="tensorrt")
+
+def test_lossy_backends_change_feature_version():
+    assert feature_version("x3d_s.1", backend="eager") == "x3d_s.1"
+    assert feature_version("x3d_s.1", backend="compile") == "x3d_s.1"
+    assert feature_version("x3d_s.1", backend="int8") == "x3d_s.1+int8"
+
+def test_int8_only_applies_to_mvit():
+    assert backbone_backend("mvit", backend="int8") == "int8"
+    assert backbone_backend("x3d", backend="int8") == "eager"
+    assert backbone_backend("slowfast", backend="int8") == "eager"
+    assert backbone_backend("x3d", backend="compile") == "compile"
+
+@pytest.fixture(scope="module")
+def sample_inputs():
+    clips = [predictor.prepare_clip(path) for path in VIDEO_PATHS]
+    return {name: [clip[name] for clip in clips] for name in EXTRACTORS}
+
+@pytest.mark.parametrize("backend", sorted(BACKEND_TOLERANCES))
+@pytest.mark.parametrize("name", sorted(EXTRACTORS))
+def test_backend_matches_eager_features(name, backend, sample_inputs):
+    load, extract = EXTRACTORS[name]
+    try:
+        model = load().eval()
+    except Exception as e:
+        pytest.skip(f"{name} weights are not available: {e}")
+
+    expected = extract(sample_inputs[name], model)
+    features = extract(sample_inputs[name], optimize_model(model, backend=backbone_backend(name, backend)))
+
+    tolerance = BACKEND_TOLERANCES[backend]
+    if tolerance["atol"] is not None:
+        assert np.allclose(features, expected, atol=tolerance["atol"])
+    cosine = (features * expected).sum(axis=1) / (np.linalg.norm(features, axis=1) * np.linalg.norm(expected, axis=1))
+    assert cosine.min() >= tolerance["min_cosine"]
+
+def test_compile_freezes_torchscript_models():
+    model = torch.jit.trace(tiny_model(), torch.zeros(1, 3, 4, 4, 4))
+    optimized = optimize_model(model, backend="compile")
+
+    x = torch.rand(2, 3, 4, 4, 4)
+    assert torch.allclose(optimized(x), model(x), atol=1e-5)
+    with pytest.raises(ValueError):
+        optimize_model(model, backend="int8")
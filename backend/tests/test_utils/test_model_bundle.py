@@ -0,0 +1,58 @@
+import os
+
+import pytest
+import torch
+from app.models.bundle import ModelBundleError, build_bundle, load_bundled_model, read_manifest
+
+class TwoStreamModel(torch.nn.Module):
+    """Takes a list of inputs, like SlowFast."""
+
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(4, 2)
+
+    def forward(self, inputs: list):
+        return self.linear(inputs[0] + inputs[1])
+
+@pytest.fixture
+def bundle_dir(tmp_path):
+    torch.manual_seed(0)
+    models = {
+        "mvit": (torch.nn.Linear(4, 3), "state_dict", (torch.zeros(2, 4),)),
+        "slowfast": (TwoStreamModel(), "torchscript", ([torch.rand(2, 4), torch.rand(2, 4)],)),
+    }
+    build_bundle(str(tmp_path), models, version="test")
+    return str(tmp_path), models
+
+def test_bundle_round_trip(bundle_dir):
+    path, models = bundle_dir
+    manifest = read_manifest(path)
+    assert manifest["bundle_version"] == "test"
+    assert set(manifest["models"]) == {"mvit", "slowfast"}
+
+    mvit = load_bundled_model(path, "mvit", {"mvit": lambda: torch.nn.Linear(4, 3)})
+    x = torch.rand(2, 4)
+    assert torch.equal(mvit(x), models["mvit"][0](x))
+
+    slowfast = load_bundled_model(path, "slowfast", {})
+    inputs = [torch.rand(5, 4), torch.rand(5, 4)]
+    assert torch.allclose(slowfast(inputs), models["slowfast"][0](inputs))
+
+def test_bundle_detects_corrupted_files(bundle_dir):
+    path, _ = bundle_dir
+    with open(os.path.join(path, "mvit.pt"), "r+b") as f:
+        content = f.read()
+        f.seek(0)
+        f.write(bytes([content[0] ^ 0xFF]))
+
+    with pytest.raises(ModelBundleError, match="Checksum"):
+        load_bundled_model(path, "mvit", {"mvit": lambda: torch.nn.Linear(4, 3)})
+
+def test_bundle_missing_model(bundle_dir):
+    path, _ = bundle_dir
+    with pytest.raises(ModelBundleError):
+        load_bundled_model(path, "x3d", {})
+
+def test_bundle_missing_manifest(tmp_path):
+    with pytest.raises(ModelBundleError):
+        read_manifest(str(tmp_path))
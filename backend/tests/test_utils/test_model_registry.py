@@ -0,0 +1,42 @@
+import pytest
+from unittest.mock import MagicMock
+from app.models.registry import ModelRegistry
+
+def test_registry_loads_each_model_once():
+    loader = MagicMock(return_value=MagicMock())
+    registry = ModelRegistry({"mvit": loader})
+
+    first = registry.get("mvit")
+    second = registry.get("mvit")
+
+    assert first is second
+    assert loader.call_count == 1
+    first.eval.assert_called_once()
+
+def test_registry_status_reports_loaded_models():
+    registry = ModelRegistry({"mvit": MagicMock(), "x3d": MagicMock()})
+    registry.get("mvit")
+
+    status = registry.status()
+    assert status["ready"] is False
+    assert status["models"]["mvit"]["loaded"] is True
+    assert status["models"]["mvit"]["load_time_seconds"] >= 0
+    assert status["models"]["x3d"] == {"loaded": False, "load_time_seconds": None}
+
+    registry.warm_up()
+    assert registry.is_ready()
+
+def test_registry_unknown_model():
+    registry = ModelRegistry({})
+    with pytest.raises(KeyError):
+        registry.get("mvit")
+
+def test_registry_prepares_models_after_eval():
+    model = MagicMock()
+    prepared = MagicMock()
+    prepare = MagicMock(return_value=prepared)
+    registry = ModelRegistry({"mvit": MagicMock(return_value=model)}, prepare=prepare)
+
+    assert registry.get("mvit") is prepared
+    model.eval.assert_called_once()
+    prepare.assert_called_once_with("mvit", model)
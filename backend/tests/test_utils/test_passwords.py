@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+import pytest
+from passlib.context import CryptContext
+
+from app.auth.passwords import PasswordHasher, PasswordHasherBusy
+
+class BlockingContext:
+    """Password context whose hashes wait until the test releases them."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def hash(self, password):
+        self.release.wait(timeout=10)
+        return f"hashed-{password}"
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_and_update():
+    hasher = PasswordHasher(CryptContext(schemes=["bcrypt"], bcrypt__rounds=5), workers=1, queue_size=1)
+    weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+
+    hashed = await hasher.hash("secret")
+
+    assert await hasher.verify_and_update("secret", hashed) == (True, None)
+    assert (await hasher.verify_and_update("wrong", hashed))[0] is False
+    valid, new_hash = await hasher.verify_and_update("secret", weak_hash)
+    assert valid and new_hash.startswith("$2b$05$")
+
+@pytest.mark.asyncio
+async def test_rejects_work_when_queue_is_full():
+    context = BlockingContext()
+    hasher = PasswordHasher(context, workers=1, queue_size=1)
+
+    running = asyncio.ensure_future(hasher.hash("a"))
+    queued = asyncio.ensure_future(hasher.hash("b"))
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(PasswordHasherBusy):
+        await hasher.hash("c")
+    status = hasher.status()
+    assert (status["active"], status["queued"], status["rejected"]) == (1, 1, 1)
+
+    context.release.set()
+    assert await asyncio.gather(running, queued) == ["hashed-a", "hashed-b"]
+    assert hasher.status()["active"] == 0
+    assert hasher.status()["max_queued"] == 1
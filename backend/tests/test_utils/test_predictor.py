@@ -0,0 +1,156 @@
+import numpy as np
+import pytest
+from app.models import predictor
+from app.models.registry import ModelRegistry
+from app.models.feature_cache import FeatureCache, feature_key
+from app.utils.hashing import file_sha256
+from app.models.predictor import run_backbones, extract_action_features, predict, BACKBONE_VERSIONS
+from tests.fakes import FakeClassifier
+
+VIDEO_PATHS = ["tests/assets/videos/clip_0.mp4", "tests/assets/videos/clip_1.mp4"]
+
+def fake_inputs(*values: float):
+    inputs = {"mvit": [], "x3d": [], "slowfast": []}
+    for value in values:
+        frames = np.full((4, 3, 2, 2), value, dtype=np.uint8)
+        inputs["mvit"].append(frames)
+        inputs["x3d"].append(frames)
+        inputs["slowfast"].append((frames[:2], frames))
+    return inputs
+
+# Each fake backbone returns the mean of its input per clip, in 0-255 pixel values
+FAKE_BACKBONES = {
+    "mvit": lambda x: (x * 0.225 + 0.45).flatten(1).mean(dim=1, keepdim=True) * 255,
+    "x3d": lambda x: x.flatten(1).mean(dim=1, keepdim=True) * 255,
+    "slowfast": lambda x: x[1].flatten(1).mean(dim=1, keepdim=True) * 255,
+}
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent"])
+def test_run_backbones_batches_clips(mode):
+    features, timings = run_backbones(fake_inputs(1, 3), FAKE_BACKBONES, mode=mode)
+
+    for name in ("mvit", "x3d", "slowfast"):
+        assert features[name].shape == (2, 1)
+        assert np.allclose(features[name][:, 0], [1, 3])
+        assert timings[name] >= 0
+
+def test_run_backbones_unknown_mode():
+    with pytest.raises(ValueError):
+        run_backbones(fake_inputs(1), FAKE_BACKBONES, mode="parallel")
+
+def test_extract_action_features_uses_cache(monkeypatch):
+    # Any decode or backbone run would fail, everything must come from the cache
+    monkeypatch.setattr(predictor, "prepare_clip", None)
+    monkeypatch.setattr(predictor, "BACKBONES", None)
+    monkeypatch.setattr(predictor, "FEATURE_CACHE", FeatureCache(disk_dir=""))
+    for i, path in enumerate(VIDEO_PATHS):
+        for name, version in BACKBONE_VERSIONS.items():
+            predictor.FEATURE_CACHE.put(feature_key(file_sha256(path), name, version), np.full(4, i))
+
+    clip_features, metadata = extract_action_features(VIDEO_PATHS + ["tests/assets/videos/missing.mp4"])
+
+    assert metadata["num_clips"] == 2
+    assert metadata["cache_hits"] == 6
+    assert set(metadata["timings"]) == {"preprocess"}
+    assert [features["x3d"][0] for features in clip_features[:2]] == [0, 1]
+    assert clip_features[2] is None
+
+def test_extract_action_features_reuses_known_features(monkeypatch):
+    monkeypatch.setattr(predictor, "prepare_clip", None)
+    monkeypatch.setattr(predictor, "BACKBONES", None)
+    known = [{name: np.full(4, 7) for name in BACKBONE_VERSIONS}]
+
+    # Clips with all their features known need no video
+    clip_features, metadata = extract_action_features([None], known)
+
+    assert metadata["stored_hits"] == 3
+    assert metadata["cache_hits"] == 0
+    assert clip_features[0]["slowfast"][0] == 7
+
+@pytest.mark.parametrize("voting", ["hard", "soft"])
+def test_predict_with_real_ensembles(monkeypatch, voting):
+    monkeypatch.setattr(predictor, "prepare_clip", None)
+    monkeypatch.setattr(predictor, "BACKBONES", None)
+    monkeypatch.setattr(predictor, "ENSEMBLE_VOTING", voting)
+    rng = np.random.default_rng(0)
+    known = [{name: rng.normal(size=400).astype(np.float32) for name in BACKBONE_VERSIONS} for _ in range(2)]
+
+    result = predict([None, None], known)
+
+    assert result["metadata"]["voting"] == voting
+    assert result["foul_confidence"] + result["no_foul_confidence"] == pytest.approx(100)
+    assert [r["backbone"] for r in result["foul_model_results"]] == ["mvit", "x3d", "slowfast"]
+    assert all(len(r["probabilities"]) == 2 for r in result["foul_model_results"])
+    if result["is_foul"]:
+        assert len(result["severity_model_results"]) == 3
+    else:
+        # No foul: severity is not evaluated
+        assert result["severity_model_results"] == []
+        assert result["severity"]["no_card"] == 100
+
+def test_predict_runs_severity_on_fouls(monkeypatch):
+    monkeypatch.setattr(predictor, "prepare_clip", None)
+    monkeypatch.setattr(predictor, "BACKBONES", None)
+    monkeypatch.setattr(predictor, "ENSEMBLE_VOTING", "hard")
+    monkeypatch.setattr(predictor, "ENSEMBLES", ModelRegistry({
+        "foul": lambda: [FakeClassifier(name, [0.2, 0.8]) for name in BACKBONE_VERSIONS],
+        "severity": lambda: [
+            FakeClassifier("mvit", [0.1, 0.2, 0.7]),
+            FakeClassifier("x3d", [0.1, 0.6, 0.3]),
+            FakeClassifier("slowfast", [0.2, 0.1, 0.7]),
+        ],
+    }))
+    known = [{name: np.zeros(400, dtype=np.float32) for name in BACKBONE_VERSIONS}]
+
+    result = predict([None], known)
+
+    assert result["is_foul"] is True
+    assert result["foul_confidence"] == 100
+    assert result["severity"] == pytest.approx({"no_card": 0, "red_card": 100 / 3, "yellow_card": 200 / 3})
+    assert [r["prediction"] for r in result["severity_model_results"]] == [2, 1, 2]
+
+def test_extract_action_features_decodes_in_pool(monkeypatch):
+    from multiprocessing.pool import ThreadPool
+
+    monkeypatch.setattr(predictor, "FEATURE_CACHE", FeatureCache(disk_dir=""))
+    monkeypatch.setattr(predictor, "BACKBONES", ModelRegistry(
+        {name: (lambda backbone=backbone: backbone) for name, backbone in FAKE_BACKBONES.items()}
+    ))
+
+    with ThreadPool(2) as pool:
+        clip_features, metadata = extract_action_features(VIDEO_PATHS + [b"not a video"], pool=pool)
+
+    # Both clips go through each backbone in a single batch, the invalid one is dropped
+    assert metadata["num_clips"] == 2
+    assert set(metadata["timings"]) == {"preprocess", *BACKBONE_VERSIONS}
+    assert all(features["x3d"].shape == (1,) for features in clip_features[:2])
+    assert clip_features[2] is None
+
+def write_truncated_clip(path, num_frames=100, kept_fraction=0.25):
+    """MJPG clip whose header counts `num_frames` but whose data stops early."""
+    import cv2
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 25, (64, 48))
+    rng = np.random.default_rng(0)
+    for _ in range(num_frames):
+        writer.write(rng.integers(0, 255, (48, 64, 3), dtype=np.uint8))
+    writer.release()
+    data = path.read_bytes()
+    path.write_bytes(data[:int(len(data) * kept_fraction)])
+
+def test_truncated_clip_is_dropped_from_the_action(monkeypatch, tmp_path):
+    monkeypatch.setattr(predictor, "FEATURE_CACHE", FeatureCache(disk_dir=""))
+    monkeypatch.setattr(predictor, "BACKBONES", ModelRegistry(
+        {name: (lambda backbone=backbone: backbone) for name, backbone in FAKE_BACKBONES.items()}
+    ))
+    truncated = tmp_path / "truncated.avi"
+    write_truncated_clip(truncated)
+
+    # The clip ends before the MViT window, decoding it fails instead of yielding an empty input
+    with pytest.raises(ValueError):
+        predictor.prepare_clip(str(truncated))
+
+    clip_features, metadata = extract_action_features(VIDEO_PATHS + [str(truncated)])
+
+    assert metadata["num_clips"] == 2
+    assert clip_features[2] is None
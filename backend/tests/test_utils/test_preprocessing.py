@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+from PIL import Image
+from app.models.frames import decode_clip
+from app.models.preprocessing import KINETICS_MEAN, KINETICS_STD, TensorBuffers, batch_to_tensor, frames_to_tensor
+
+VIDEO_PATH = "tests/assets/videos/clip_0.mp4"
+
+def test_batch_to_tensor_matches_float_division():
+    clip = decode_clip(VIDEO_PATH)
+    clips = [clip.head(32), clip.strided(32, min_frames=32)]
+
+    batch = batch_to_tensor("test", clips)
+
+    expected = torch.tensor(np.stack(clips)).float() / 255.0
+    assert torch.equal(batch, expected.permute(0, 2, 1, 3, 4))
+
+def test_resize_and_normalize_matches_pil_transform():
+    clip = decode_clip(VIDEO_PATH, start_frame=50, end_frame=80, num_samples=16)
+    frames = np.stack(clip.samples).transpose(0, 3, 1, 2)
+
+    out = torch.empty((3, 16, 224, 224))
+    frames_to_tensor(frames, out, size=(224, 224), rgb=True, mean=KINETICS_MEAN, std=KINETICS_STD)
+
+    transform = transforms.Compose([
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=KINETICS_MEAN, std=KINETICS_STD),
+    ])
+    expected = torch.stack([
+        transform(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))) for frame in clip.samples
+    ]).permute(1, 0, 2, 3)
+    # Both resize uint8 frames, rounding may differ by one pixel level
+    assert (out - expected).abs().max() <= 1.01 / 255 / KINETICS_STD[0]
+
+def test_tensor_buffers_are_reused_per_shape():
+    buffers = TensorBuffers()
+    first = buffers.get("x3d", (1, 3, 4, 2, 2))
+
+    assert buffers.get("x3d", (1, 3, 4, 2, 2)) is first
+    assert buffers.get("x3d", (2, 3, 4, 2, 2)) is not first
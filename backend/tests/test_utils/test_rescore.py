@@ -0,0 +1,98 @@
+import json
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Action, Base, Clip, ClipFeature, Prediction, User
+from app.models import predictor
+from app.models.config import BACKBONE_VERSIONS
+from app.models.registry import ModelRegistry
+from app.predict.rescore import read_checkpoint, rescore
+from tests.fakes import FakeClassifier
+
+@pytest.fixture()
+def engine(monkeypatch):
+    # Every feature is stored, nothing is decoded nor goes through a backbone
+    monkeypatch.setattr(predictor, "prepare_clip", None)
+    monkeypatch.setattr(predictor, "BACKBONES", None)
+    monkeypatch.setattr(predictor, "ENSEMBLES", ModelRegistry({
+        "foul": lambda: [FakeClassifier(name, [0.2, 0.8]) for name in BACKBONE_VERSIONS],
+        "severity": lambda: [FakeClassifier(name, [0.1, 0.2, 0.7]) for name in BACKBONE_VERSIONS],
+    }))
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        user = User(email="rescore@example.com", password="x")
+        db.add(user)
+        for num_clips in (1, 2, 0, 1, 2):
+            action = Action(user=user)
+            for _ in range(num_clips):
+                action.clips.append(Clip(features=[
+                    ClipFeature(backbone=name, model_version=version, dim=4, vector=np.ones(4, dtype=np.float32).tobytes())
+                    for name, version in BACKBONE_VERSIONS.items()
+                ]))
+            db.add(action)
+        db.flush()
+        # Outdated prediction of the first action
+        first = db.query(Action).order_by(Action.id).first()
+        db.add(Prediction(
+            action_id=first.id, is_foul=False, foul_confidence=0, no_foul_confidence=100, foul_model_results=[],
+            no_card_confidence=100, red_card_confidence=0, yellow_card_confidence=0, severity_model_results=[],
+        ))
+        db.commit()
+    return engine
+
+def test_rescore_replaces_predictions_in_pages(engine, tmp_path):
+    checkpoint_path = str(tmp_path / "rescore.json")
+
+    checkpoint = rescore(engine, page_size=2, checkpoint_path=checkpoint_path)
+
+    assert checkpoint == {"last_action_id": 5, "rescored": 4, "failed": 0, "skipped": 1}
+    assert read_checkpoint(checkpoint_path) == checkpoint
+    with Session(engine) as db:
+        predictions = db.query(Prediction).order_by(Prediction.action_id).all()
+        assert [p.action_id for p in predictions] == [1, 2, 4, 5]
+        assert all(p.is_foul and p.yellow_card_confidence == 100 for p in predictions)
+        assert [r["backbone"] for r in predictions[0].foul_model_results] == list(BACKBONE_VERSIONS)
+
+def test_rescore_resumes_from_checkpoint(engine, tmp_path):
+    checkpoint_path = tmp_path / "rescore.json"
+    checkpoint_path.write_text(json.dumps({"last_action_id": 2, "rescored": 2, "failed": 0, "skipped": 0}))
+
+    checkpoint = rescore(engine, page_size=2, checkpoint_path=str(checkpoint_path))
+
+    assert checkpoint == {"last_action_id": 5, "rescored": 4, "failed": 0, "skipped": 1}
+    with Session(engine) as db:
+        # The actions before the checkpoint are left untouched
+        predictions = db.query(Prediction).order_by(Prediction.action_id).all()
+        assert [(p.action_id, p.is_foul) for p in predictions] == [(1, False), (4, True), (5, True)]
+
+def test_rescore_keeps_going_past_failing_actions(engine, tmp_path, monkeypatch):
+    with Session(engine) as db:
+        # Action 2: clips with features of different sizes, its classification fails
+        feature = db.query(ClipFeature).join(Clip).filter(Clip.action_id == 2).first()
+        feature.vector = np.ones(3, dtype=np.float32).tobytes()
+        feature.dim = 3
+        # Action 4: its feature extraction fails
+        for feature in db.query(ClipFeature).join(Clip).filter(Clip.action_id == 4):
+            feature.vector = np.full(4, 2, dtype=np.float32).tobytes()
+        db.commit()
+
+    extract_action_features = predictor.extract_action_features
+    def failing_extract(video_sources, known_features=None, pool=None):
+        if any(np.all(vector == 2) for known in known_features for vector in known.values()):
+            raise ValueError("corrupt clip")
+        return extract_action_features(video_sources, known_features, pool)
+    monkeypatch.setattr(predictor, "extract_action_features", failing_extract)
+
+    checkpoint = rescore(engine, page_size=2, checkpoint_path=str(tmp_path / "rescore.json"))
+
+    assert checkpoint == {"last_action_id": 5, "rescored": 2, "failed": 2, "skipped": 1}
+    with Session(engine) as db:
+        predictions = db.query(Prediction).order_by(Prediction.action_id).all()
+        # The failed actions keep their previous prediction, if any
+        assert [(p.action_id, p.is_foul) for p in predictions] == [(1, True), (5, True)]
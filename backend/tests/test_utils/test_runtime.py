@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+from app.models.runtime import ENSEMBLES, StartupProfile, configure_threads
+
+def test_api_import_does_not_load_the_prediction_stack():
+    # A fresh interpreter, since the test session may already have imported torch
+    code = "import sys, main; print(','.join(m for m in ('torch', 'torchvision', 'cv2', 'xgboost') if m in sys.modules))"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True, text=True, check=True,
+        env={**os.environ, "ENV": "test"},
+    )
+    assert result.stdout.strip() == ""
+
+def test_ensembles_have_a_single_owner():
+    from app.models import predictor
+
+    assert predictor.ENSEMBLES is ENSEMBLES
+    assert [c.backbone for c in ENSEMBLES.get("foul")] == ["mvit", "x3d", "slowfast"]
+    assert ENSEMBLES.get("foul") is ENSEMBLES.get("foul")
+
+def test_startup_profile_times_new_imports():
+    profile = StartupProfile()
+    profile.import_modules(["sys", "json"])
+    # Modules already imported cost nothing and are not reported
+    assert "sys" not in profile.imports
+
+    report = profile.report()
+    assert report["total_import_seconds"] == sum(profile.imports.values())
+    assert report["loads"]["foul"] is None or report["loads"]["foul"] >= 0
+
+def test_thread_count_is_only_set_for_concurrent_mode(monkeypatch):
+    import torch
+
+    calls = []
+    monkeypatch.setattr(torch, "set_num_threads", calls.append)
+    configure_threads("sequential", 4)
+    configure_threads("concurrent", 0)
+    configure_threads("concurrent", 4)
+    assert calls == [4]
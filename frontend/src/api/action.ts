@@ -1,6 +1,19 @@
 const API_URL = import.meta.env.VITE_API_URL;
 
-export async function getLastAction(token: string) {
+export interface ActionClip {
+  id: number;
+  size_bytes: number;
+  sha256: string;
+  duration_seconds: number | null;
+  url: string;
+}
+
+export interface ActionResponse {
+  action_id: number;
+  clips: ActionClip[];
+}
+
+export async function getLastAction(token: string): Promise<ActionResponse> {
     const response = await fetch(`${API_URL}/action/last`, {
       method: "GET",
       headers: {
@@ -16,6 +16,16 @@ export interface ModelResult {
   
   model: string;
   prediction: number;
+  backbone?: string;
+  probabilities?: number[];
+}
+
+export interface PredictionMetadata {
+  execution_mode: string;
+  inference_backend: string;
+  voting: "hard" | "soft";
+  num_clips: number;
+  timings: Record<string, number>;
 }
 
 export interface SinglePrediction {
@@ -26,8 +36,17 @@ export interface SinglePrediction {
   severity: SeverityPrediction;
   foul_model_results: ModelResult[];
   severity_model_results: ModelResult[];
+  metadata?: PredictionMetadata;
 }
 
 export interface PredictResponse {
   results: SinglePrediction[];
-}
\ No newline at end of file
+}
+
+export interface PredictJob {
+  job_id: string;
+  action_id: number;
+  status: "queued" | "running" | "completed" | "failed";
+  result: PredictResponse | null;
+  error: string | null;
+}
@@ -1,9 +1,11 @@
 import React, { useState, useRef, useEffect } from "react";
-import { PredictResponse, SinglePrediction } from "../api/predict";
+import { PredictJob, PredictResponse, SinglePrediction } from "../api/predict";
+import { ActionClip } from "../api/action";
 import Navbar from "../components/Navbar";
 import Toast from "../components/Toast";
 
 const API_URL = import.meta.env.VITE_API_URL;
+const JOB_POLL_INTERVAL_MS = 1000;
 
 export default function MainPage() {
   const [selectedVideos, setSelectedVideos] = useState<string[]>([]);
@@ -43,8 +45,28 @@ export default function MainPage() {
         throw new Error(errorData.detail || "Failed to run prediction");
       }
 
-      const data: PredictResponse = await response.json();
-      setPredictions(data.results);
+      // The prediction runs in the background, poll its job until it finishes
+      let job: PredictJob = await response.json();
+      while (job.status === "queued" || job.status === "running") {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const jobResponse = await fetch(`${API_URL}/predict/jobs/${job.job_id}`, {
+          method: "GET",
+          headers: {
+            Authorization: `Bearer ${token}`,
+          },
+        });
+        if (!jobResponse.ok) {
+          const errorData = await jobResponse.json();
+          throw new Error(errorData.detail || "Failed to fetch prediction status");
+        }
+        job = await jobResponse.json();
+      }
+
+      if (job.status === "failed" || !job.result) {
+        throw new Error(job.error || "Prediction failed");
+      }
+
+      setPredictions(job.result.results);
       setToast({ message: "Prediction successfully run!", type: "success" });
     } catch (err: any) {
       console.error("Prediction error", err);
@@ -99,10 +121,8 @@ export default function MainPage() {
         }
 
         const data = await res.json();
-        const videoURLs = data.clips.map((clip: any) => {
-          const binary = Uint8Array.from(atob(clip.content), (c) => c.charCodeAt(0));
-          return URL.createObjectURL(new Blob([binary], { type: "video/mp4" }));
-        });
+        // Clips are streamed by the browser straight from their signed URLs
+        const videoURLs = data.clips.map((clip: ActionClip) => clip.url);
 
         setSelectedVideos(videoURLs);
 
@@ -3,17 +3,14 @@ import { useSelectedVideos } from "../context/SelectedVideosContext";
 import { useNavigate } from "react-router-dom";
 import { uploadClips } from "../api/upload";
 import Navbar from "../components/Navbar";
-import { getLastAction } from "../api/action";
+import { ActionResponse, getLastAction } from "../api/action";
 import Toast from "../components/Toast";
 
 export default function UploadPage() {
   const { selectedVideos, setSelectedVideos, uploadedFiles, setUploadedFiles } = useSelectedVideos();
   const navigate = useNavigate();
   const [uploadProgress, setUploadProgress] = useState<number[]>([]);
-  const [lastAction, setLastAction] = useState<{
-    action_id: number;
-    clips: { id: number; content: string }[];
-  } | null>(null);
+  const [lastAction, setLastAction] = useState<ActionResponse | null>(null);
   const [errorMessage, setErrorMessage] = useState<string | null>(null);
 
   useEffect(() => {
@@ -139,13 +136,13 @@ export default function UploadPage() {
             </h3>
             {lastAction ? (
               <div className="grid grid-cols-2 gap-4">
-                {lastAction.clips.map((clip: any, idx: number) => (
+                {lastAction.clips.map((clip, idx: number) => (
                   <div
                     key={idx}
                     className="rounded overflow-hidden border border-gray-200 dark:border-gray-700"
                   >
                     <video
-                      src={`data:video/mp4;base64,${clip.content}`}
+                      src={clip.url}
                       className="w-full h-24 object-cover"
                       controls
                       muted
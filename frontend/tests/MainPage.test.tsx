@@ -43,8 +43,8 @@ describe('MainPage', () => {
                     ok: true,
                     json: () => Promise.resolve({
                         clips: [
-                            { content: btoa('mocked-binary-data-1') },
-                            { content: btoa('mocked-binary-data-2') },
+                            { id: 1, size_bytes: 20, sha256: 'hash1', url: 'http://api/clips/1/stream?token=t1' },
+                            { id: 2, size_bytes: 20, sha256: 'hash2', url: 'http://api/clips/2/stream?token=t2' },
                         ],
                     }),
                 });
@@ -60,7 +60,13 @@ describe('MainPage', () => {
             if (url.includes('/v1/predict/action123') && options?.method === 'POST') {
                 return Promise.resolve({
                     ok: true,
-                    json: () => Promise.resolve(mockPredResponse),
+                    json: () => Promise.resolve({
+                        job_id: 'job123',
+                        action_id: 123,
+                        status: 'completed',
+                        result: mockPredResponse,
+                        error: null,
+                    }),
                 });
             }
 